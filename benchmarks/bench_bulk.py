@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Benchmark of updating many Things at once.
+
+Compares setting the `state` of each Sensor, MqttManager.publish_many and
+setting the states within a MqttManager.batch block, publishing to a
+NullClient (see common.py).
+"""
+
+import timeit
+
+from ham.sensor import Sensor
+
+from common import indexed, null_manager
+
+BenchSensor = indexed(Sensor, "Sensor")
+
+
+def main(number=200):
+    print("%8s %14s %14s %14s" % ("things", "state (us)", "many (us)", "batch (us)"))
+    for n in (10, 100, 1000, 10000):
+        sensors = [BenchSensor(i) for i in range(n)]
+        manager = null_manager(sensors)
+        values = [float(i) / 3 for i in range(n)]
+
+        def one_by_one():
+            for sensor, value in zip(sensors, values):
+                sensor.state = value
+
+        def many():
+            manager.publish_many(zip(sensors, values))
+
+        def batch():
+            with manager.batch():
+                for sensor, value in zip(sensors, values):
+                    sensor.state = value
+
+        results = [timeit.timeit(f, number=number) / number * 1e6
+                   for f in (one_by_one, many, batch)]
+        print("%8d %14.1f %14.1f %14.1f" % (n, *results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark of the inbound command dispatch as the amount of Things grows.
+
+Compares the routing table of the MqttManager (a single dict lookup in
+on_message) against registering one paho `message_callback_add` filter per
+command topic. No broker is needed: messages are fed directly to the client.
+"""
+
+import timeit
+
+import paho.mqtt.client as mqtt
+
+from ham import MqttManager
+from ham.switch import Switch
+from ham.utils import WrapperCallback
+
+from common import indexed
+
+BenchSwitch = indexed(Switch, "Switch")
+
+
+def build_manager(n: int) -> MqttManager:
+    manager = MqttManager(node_id="bench", unique_identifier="bench")
+    manager.add_things([BenchSwitch(i) for i in range(n)])
+    return manager
+
+
+def build_paho_client(n: int) -> mqtt.Client:
+    client = mqtt.Client()
+    for i in range(n):
+        client.message_callback_add(f"bench/switch{ i }/set",
+                                    WrapperCallback(BenchSwitch(i).raw_callback))
+    return client
+
+
+def message(topic: str) -> mqtt.MQTTMessage:
+    msg = mqtt.MQTTMessage(topic=topic.encode("utf-8"))
+    msg.payload = b"ON"
+    return msg
+
+
+def main(number=20000):
+    print("%8s %14s %14s" % ("things", "router (us)", "paho (us)"))
+    for n in (10, 100, 1000, 10000):
+        msg = message(f"bench/switch{ n // 2 }/set")
+
+        manager = build_manager(n)
+        router = timeit.timeit(lambda: manager.on_message(None, None, msg), number=number)
+
+        client = build_paho_client(n)
+        paho = timeit.timeit(lambda: client._handle_on_message(msg), number=number)
+
+        print("%8d %14.3f %14.3f" % (n, router / number * 1e6, paho / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Benchmark of the JSON backends on the payloads handled by the library.
+
+Measures the encoding of a discovery config and of a large attributes dict,
+and the decoding of a Light command, for every installed backend.
+"""
+
+import timeit
+
+from ham import MqttManager, serialization
+from ham.sensor import Sensor
+
+
+class BenchSensor(Sensor):
+    name = "Bench sensor"
+    short_id = "bench"
+    device_class = "temperature"
+    unit_of_measurement = "°C"
+    state_class = "measurement"
+
+
+def main(number=100000):
+    manager = MqttManager(node_id="bench", unique_identifier="bench")
+    sensor = BenchSensor()
+    manager.add_thing(sensor)
+
+    _, config = manager.get_discovery_config(None, sensor)
+    attributes = {"attribute_%d" % i: i * 1.5 if i % 2 else "value %d" % i for i in range(40)}
+    command = b'{"state": "ON", "brightness": 128, "transition": 2}'
+
+    header = ("backend", "discovery (us)", "attributes (us)", "command (us)")
+    print("%8s %16s %16s %16s" % header)
+    for backend in ("json", "ujson", "orjson"):
+        try:
+            serialization.set_json_backend(backend)
+        except ImportError:
+            print("%8s %16s" % (backend, "not installed"))
+            continue
+
+        results = [
+            timeit.timeit(lambda: serialization.dumps(config), number=number),
+            timeit.timeit(lambda: serialization.dumps(attributes), number=number),
+            timeit.timeit(lambda: serialization.loads(command), number=number),
+        ]
+        print("%8s %16.3f %16.3f %16.3f" % (backend, *(r / number * 1e6 for r in results)))
+
+    serialization.set_json_backend()
+
+
+if __name__ == "__main__":
+    main()
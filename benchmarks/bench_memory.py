@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Benchmark of the memory used per Thing, regular versus slotted classes.
+
+Measures the bytes allocated (with tracemalloc) to create and register Things
+in a MqttManager, for the regular classes and their ham.compact variants.
+"""
+
+import tracemalloc
+
+from ham import MqttManager
+from ham.binary_sensor import BinarySensor
+from ham.compact import CompactBinarySensor, CompactNumber, CompactSensor, CompactSwitch
+from ham.number import OptimisticNumber
+from ham.sensor import Sensor
+from ham.switch import OptimisticSwitch
+
+
+def regular(cls):
+    class Regular(cls):
+        def __init__(self, short_id):
+            self.short_id = short_id
+            self.name = short_id
+
+        def callback(self, state):
+            pass
+
+    return Regular
+
+
+CLASSES = [
+    ("sensor", regular(Sensor), CompactSensor),
+    ("binary_sensor", regular(BinarySensor), CompactBinarySensor),
+    ("switch", regular(OptimisticSwitch), CompactSwitch),
+    ("number", regular(OptimisticNumber), CompactNumber),
+]
+
+
+def measure(cls, n: int) -> float:
+    manager = MqttManager(node_id="bench", unique_identifier="bench")
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    manager.add_things([cls("t%d" % i) for i in range(n)])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename")) / n
+
+
+def main(n=50000):
+    print("%14s %14s %14s" % ("component", "regular (B)", "compact (B)"))
+    for component, regular_cls, compact_cls in CLASSES:
+        print("%14s %14.1f %14.1f" % (component, measure(regular_cls, n), measure(compact_cls, n)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Bytes on the wire of the state updates of a fleet, MQTT 3.1.1 vs MQTT 5.
+
+A fleet of 1000 Sensors publishes several rounds of states through a real
+paho Client. The client is not connected: the PUBLISH packets it builds are
+captured and measured instead of being written to a socket. In MQTT 5 mode,
+the broker is assumed to allow as many topic aliases as Sensors (mosquitto
+allows 10 by default; see its max_topic_alias option). The last run uses
+Sensors with an `expire_after`, which adds the message expiry property.
+"""
+
+import paho.mqtt.client as mqtt
+
+from ham import MqttManager
+from ham.sensor import Sensor
+
+from common import indexed
+
+BenchSensor = indexed(Sensor, "Temperature")
+ExpiringSensor = indexed(Sensor, "Temperature", expire_after=300)
+
+
+class NullSocket:
+    def close(self):
+        pass
+
+
+def capture(client):
+    sizes = list()
+
+    def packet_queue(command, packet, mid, qos, info=None):
+        sizes.append(len(packet))
+        return mqtt.MQTT_ERR_SUCCESS
+
+    client._packet_queue = packet_queue
+    # Any socket, so that the client does not refuse to publish
+    client._sock = NullSocket()
+    return sizes
+
+
+def run(protocol, things=1000, rounds=10, aliases=None, cls=BenchSensor):
+    manager = MqttManager(node_id="bench-node", unique_identifier="bench", protocol=protocol)
+    sensors = [cls(i) for i in range(things)]
+    manager.add_things(sensors)
+    sizes = capture(manager.client)
+    if manager.aliases is not None:
+        manager.aliases.reset(aliases if aliases is not None else things)
+
+    for round in range(rounds):
+        for i, sensor in enumerate(sensors):
+            sensor.state = 20 + (i + round) % 10 / 10
+    return sum(sizes)
+
+
+def main(things=1000, rounds=10):
+    print("%d sensors, %d updates each" % (things, rounds))
+    baseline = run(mqtt.MQTTv311, things, rounds)
+    print("%-28s %10d bytes" % ("MQTT 3.1.1", baseline))
+    for label, aliases, cls in (("MQTT 5 (no aliases)", 0, BenchSensor),
+                                ("MQTT 5 (10 aliases)", 10, BenchSensor),
+                                ("MQTT 5 (aliases for all)", None, BenchSensor),
+                                ("MQTT 5 (aliases, expiry)", None, ExpiringSensor)):
+        size = run(mqtt.MQTTv5, things, rounds, aliases, cls)
+        print("%-28s %10d bytes (%+.1f%%)" % (label, size, (size - baseline) / baseline * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark of the per-publish cost of Thing.publish_state.
+
+Compares the current implementation (cached topics and per-type encoders)
+against the previous one (topic formatting and if/elif encoding on every
+publish), both publishing to a NullClient (see common.py).
+"""
+
+import timeit
+
+from ham.sensor import Sensor
+
+from common import null_manager
+
+
+class BenchSensor(Sensor):
+    name = "Bench sensor"
+    short_id = "bench"
+
+
+class RoundedSensor(BenchSensor):
+    float_precision = 2
+
+
+def legacy_publish_state(thing, state):
+    if state is True:
+        payload = b'ON'
+    elif state is False:
+        payload = b'OFF'
+    elif isinstance(state, bytes):
+        payload = state
+    else:
+        payload = bytes(str(state), "UTF-8")
+
+    thing.mqtt_manager.client.publish(
+        f'{ thing.mqtt_manager.base_topic }/{ thing.short_id }/main',
+        payload
+    )
+
+
+def main(number=200000):
+    sensor = BenchSensor()
+    rounded = RoundedSensor()
+    null_manager([sensor, rounded])
+
+    print("%8s %12s %12s %12s" % ("state", "legacy (us)", "new (us)", "rounded (us)"))
+    for state in (True, 42, 21.123456789, "text"):
+        # Best of several runs, as these are sub-microsecond timings
+        legacy = min(timeit.repeat(lambda: legacy_publish_state(sensor, state), number=number))
+        new = min(timeit.repeat(lambda: sensor.publish_state(state), number=number))
+        rnd = min(timeit.repeat(lambda: rounded.publish_state(state), number=number))
+        print("%8s %12.3f %12.3f %12.3f" % (type(state).__name__, legacy / number * 1e6,
+                                            new / number * 1e6, rnd / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
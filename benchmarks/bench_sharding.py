@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Throughput of command handling when the Things are sharded across processes.
+
+Each worker process runs a sharded MqttManager (see ham.sharding) holding the
+same 1000 Switches, connected to its own FakeBroker. The parent process acts
+as the broker stand-in: it collects the subscriptions of the workers and
+routes every command to the worker subscribed to its topic, as a broker does
+with the exact per-shard subscriptions. The Switch callbacks burn some CPU,
+to model the work of a bridge (parsing, driving hardware...).
+
+The figures include the cost of moving the messages between processes
+through multiprocessing queues, which a real broker connection also has.
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+
+import paho.mqtt.client as mqtt
+
+from ham import MqttManager
+from ham.fake import FakeBroker, FakeClient
+from ham.switch import OptimisticSwitch
+
+from common import indexed
+
+THINGS = 1000
+BATCH = 500
+
+
+def callback(self, state: bool):
+    sum(range(2000))  # some work
+    self.state = state
+
+
+BenchSwitch = indexed(OptimisticSwitch, "Switch", callback=callback)
+
+
+def worker(shard_index, shard_count, inbox, outbox):
+    broker = FakeBroker()
+    manager = MqttManager(node_id="bridge", unique_identifier="bench", client=FakeClient(broker),
+                          shard_index=shard_index, shard_count=shard_count)
+    manager.add_things([BenchSwitch(i) for i in range(THINGS)])
+    manager.client.connect()
+    outbox.put((shard_index, [topic for topic, _ in manager.subscribe_topic]))
+
+    handled = 0
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            break
+        for topic, payload in batch:
+            broker.publish(topic, payload)
+        handled += len(batch)
+    outbox.put((shard_index, handled))
+
+
+def run(shard_count, commands):
+    inboxes = [multiprocessing.Queue() for _ in range(shard_count)]
+    outbox = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=worker, args=(i, shard_count, inboxes[i], outbox))
+               for i in range(shard_count)]
+    for process in workers:
+        process.start()
+
+    # The broker stand-in: route each topic to the subscribed worker
+    routes = dict()
+    subscriptions = list()
+    for _ in range(shard_count):
+        shard_index, topics = outbox.get()
+        for topic in topics:
+            if "+" in topic or "#" in topic:
+                subscriptions.append((topic, shard_index))
+            else:
+                routes[topic] = shard_index
+
+    def route(topic):
+        try:
+            return routes[topic]
+        except KeyError:
+            return next(index for sub, index in subscriptions if mqtt.topic_matches_sub(sub, topic))
+
+    start = time.perf_counter()
+    batches = [list() for _ in range(shard_count)]
+    for topic, payload in commands:
+        index = route(topic)
+        batches[index].append((topic, payload))
+        if len(batches[index]) == BATCH:
+            inboxes[index].put(batches[index])
+            batches[index] = list()
+    for index, batch in enumerate(batches):
+        if batch:
+            inboxes[index].put(batch)
+        inboxes[index].put(None)
+
+    handled = [0] * shard_count
+    for _ in range(shard_count):
+        shard_index, count = outbox.get()
+        handled[shard_index] = count
+    elapsed = time.perf_counter() - start
+
+    for process in workers:
+        process.join()
+    return elapsed, handled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=50000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    commands = [("bridge/switch%d/set" % rng.randrange(THINGS), rng.choice((b"ON", b"OFF")))
+                for _ in range(args.commands)]
+
+    print("%6s %12s %14s  %s" % ("shards", "elapsed (s)", "commands/s", "commands per shard"))
+    for shard_count in args.shards:
+        elapsed, handled = run(shard_count, commands)
+        print("%6d %12.3f %14.0f  %s" % (shard_count, elapsed, sum(handled) / elapsed, handled))
+
+
+if __name__ == "__main__":
+    main()
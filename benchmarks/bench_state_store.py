@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Benchmark of the cost of persisting the state of optimistic Things.
+
+Compares setting the `state` of an OptimisticSwitch without state store and
+with a LogStateStore, and measures the background flush (one write and one
+fsync for all the changes since the previous flush). The states are
+published to a NullClient (see common.py).
+"""
+
+import os
+import tempfile
+import time
+import timeit
+
+from ham.statestore import LogStateStore
+from ham.switch import OptimisticSwitch
+
+from common import indexed, null_manager
+
+BenchSwitch = indexed(OptimisticSwitch, "Switch")
+
+
+def build(state_store=None, n=1000):
+    switches = [BenchSwitch(i) for i in range(n)]
+    return null_manager(switches, state_store=state_store), switches
+
+
+def main(number=200000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "states.log")
+        # No background flushes during the measurement of the hot path
+        store = LogStateStore(path, flush_interval=3600)
+
+        results = list()
+        for state_store in (None, store):
+            manager, switches = build(state_store)
+            switch = switches[0]
+            values = [True, False]
+
+            def update():
+                switch.state = values[0]
+                values.reverse()
+
+            results.append(timeit.timeit(update, number=number) / number * 1e6)
+
+        print("%-28s %8.3f us" % ("state update, no store", results[0]))
+        print("%-28s %8.3f us (%+.3f us)"
+              % ("state update, log store", results[1], results[1] - results[0]))
+
+        for changed in (1, 100, 1000):
+            for switch in switches[:changed]:
+                switch.state = not switch.state
+            start = time.perf_counter()
+            store.flush()
+            elapsed = time.perf_counter() - start
+            print("%-28s %8.3f ms" % ("flush of %d changes" % changed, elapsed * 1e3))
+
+        store.close()
+        print("%-28s %8d bytes" % ("log size", os.path.getsize(path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Benchmark suite of the library, with the results emitted as JSON.
+
+Measures, with the MQTT client replaced by a no-op (no broker is needed):
+
+ - discovery: time of MqttManager.on_connect for an increasing amount of Things
+ - publish: Thing.publish_state calls per second, for each component
+ - dispatch: latency of an inbound command, from on_message to the callback
+ - memory: bytes allocated per Thing (including its registration)
+
+Usage:
+
+    python bench_suite.py [--quick] [--output results.json]
+
+Keep the JSON files of each release to track regressions.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+import paho.mqtt.client as mqtt
+
+from ham import __version__
+from ham.fan import PercentageOptimisticFan
+from ham.light import DimmableLight
+from ham.number import OptimisticNumber
+from ham.sensor import Sensor
+from ham.switch import OptimisticSwitch
+
+from common import indexed, null_manager
+
+BenchSwitch = indexed(OptimisticSwitch, "Switch")
+
+# Component class and a representative state
+COMPONENTS = {
+    "sensor": (indexed(Sensor, "Sensor"), 21.5),
+    "switch": (BenchSwitch, True),
+    "number": (indexed(OptimisticNumber, "Number", min=0, max=100, step=1), 42),
+    "fan": (indexed(PercentageOptimisticFan, "Fan"), False),
+    "light": (indexed(DimmableLight, "Light"), True),
+}
+
+
+def bench_discovery(sizes, repeat):
+    results = dict()
+    for n in sizes:
+        manager = null_manager(BenchSwitch(i) for i in range(n))
+        durations = timeit.repeat(lambda: manager.on_connect(None, None, {}, 0),
+                                  number=1, repeat=repeat)
+        results[str(n)] = {"seconds": min(durations), "per_thing_us": min(durations) / n * 1e6}
+    return results
+
+
+def bench_publish(number):
+    results = dict()
+    for component, (cls, state) in COMPONENTS.items():
+        thing = cls(0)
+        null_manager([thing])
+        elapsed = timeit.timeit(lambda: thing.publish_state(state), number=number)
+        results[component] = {"per_second": number / elapsed, "us": elapsed / number * 1e6}
+    return results
+
+
+def bench_dispatch(sizes, number):
+    results = dict()
+    for n in sizes:
+        manager = null_manager(BenchSwitch(i) for i in range(n))
+        msg = mqtt.MQTTMessage(topic=b"bench/switch%d/set" % (n // 2))
+        msg.payload = b"ON"
+        elapsed = timeit.timeit(lambda: manager.on_message(None, None, msg), number=number)
+        results[str(n)] = {"us": elapsed / number * 1e6}
+    return results
+
+
+def bench_memory(n):
+    results = dict()
+    for component, (cls, _) in COMPONENTS.items():
+        manager = null_manager()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        things = [cls(i) for i in range(n)]
+        manager.add_things(things)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        results[component] = {"bytes_per_thing": allocated / n}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a smoke run")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    if args.quick:
+        sizes, number, repeat = (10, 1000), 10000, 3
+    else:
+        sizes, number, repeat = (10, 1000, 10000), 200000, 5
+
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "discovery": bench_discovery(sizes, repeat),
+        "publish": bench_publish(number),
+        "dispatch": bench_dispatch(sizes, number),
+        "memory": bench_memory(max(sizes)),
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Helpers shared by the benchmarks."""
+
+from ham import MqttManager
+from ham.things import Thing
+
+
+class NullClient:
+    """No-op replacement of the paho Client, so that only the library is measured."""
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        pass
+
+    def subscribe(self, topic, qos=0):
+        pass
+
+
+def null_manager(things=(), **kwargs) -> MqttManager:
+    """MqttManager publishing to a NullClient, with `things` added."""
+    manager = MqttManager(node_id="bench", unique_identifier="bench", **kwargs)
+    manager.client = NullClient()
+    manager.add_things(list(things))
+    return manager
+
+
+def _ignore(self, *args, **kwargs):
+    pass
+
+
+def indexed(cls: type[Thing], label: str, **attributes) -> type[Thing]:
+    """Subclass of the Thing class `cls`, instantiated with an index.
+
+    The instances are named "<label> <index>", with "<label><index>" (in
+    lowercase) as short_id. `attributes` are set on the subclass; the
+    callback, if abstract and not given, does nothing.
+    """
+    prefix = label.lower()
+
+    def __init__(self, index: int):
+        self.name = "%s %d" % (label, index)
+        self.short_id = "%s%d" % (prefix, index)
+
+    namespace = {"__init__": __init__, **attributes}
+    if "callback" in getattr(cls, "__abstractmethods__", ()):
+        namespace.setdefault("callback", _ignore)
+    return type(cls.__name__, (cls,), namespace)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Example of a Switch managed from an asyncio application.
+
+The AsyncMqttManager runs the MQTT connection in the asyncio event loop, so
+there is no additional thread. The callback of the switch is a coroutine, and
+changes to the state can be done from any coroutine.
+"""
+
+import asyncio
+import os
+
+from ham import AsyncMqttManager
+from ham.switch import OptimisticSwitch
+
+MQTT_USERNAME = os.environ["MQTT_USERNAME"]
+MQTT_PASSWORD = os.environ["MQTT_PASSWORD"]
+MQTT_HOST = os.environ["MQTT_HOST"]
+
+
+class AsyncSwitch(OptimisticSwitch):
+    name = "Async Switch"
+    short_id = "asyncswitch"
+
+    async def callback(self, state: bool):
+        super().callback(state)
+        # Something slow can be awaited here without blocking MQTT
+        await asyncio.sleep(1)
+        print("The switch state is: %s" % state)
+
+
+async def main():
+    main_switch = AsyncSwitch()
+    manager = AsyncMqttManager(MQTT_HOST, username=MQTT_USERNAME, password=MQTT_PASSWORD)
+    manager.add_thing(main_switch)
+
+    mqtt_task = asyncio.create_task(manager.run())
+
+    print("Entering an infinite loop, Ctrl+C to exit.")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            main_switch.state = not main_switch.state
+    finally:
+        await manager.stop()
+        await mqtt_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,6 @@
 __version__ = "0.5.9"
 
 from .manager import MqttManager, DeviceInfo
+from .async_manager import AsyncMqttManager
 
-__all__ = ["MqttManager", "DeviceInfo"]
+__all__ = ["MqttManager", "AsyncMqttManager", "DeviceInfo"]
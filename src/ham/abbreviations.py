@@ -0,0 +1,90 @@
+"""Abbreviations of the discovery config keys accepted by Home Assistant.
+
+See https://www.home-assistant.io/integrations/mqtt/#discovery-payload
+(the tables are indexed by the full key, as that is how they are used here).
+"""
+
+ABBREVIATIONS: dict[str, str] = {
+    "availability": "avty",
+    "availability_mode": "avty_mode",
+    "availability_template": "avty_tpl",
+    "availability_topic": "avty_t",
+    "brightness_command_topic": "bri_cmd_t",
+    "brightness_scale": "bri_scl",
+    "brightness_state_topic": "bri_stat_t",
+    "color_mode": "clrm",
+    "command_template": "cmd_tpl",
+    "command_topic": "cmd_t",
+    "components": "cmps",
+    "device": "dev",
+    "device_class": "dev_cla",
+    "enabled_by_default": "en",
+    "encoding": "e",
+    "entity_category": "ent_cat",
+    "expire_after": "exp_aft",
+    "force_update": "frc_upd",
+    "icon": "ic",
+    "json_attributes_template": "json_attr_tpl",
+    "json_attributes_topic": "json_attr_t",
+    "object_id": "obj_id",
+    "optimistic": "opt",
+    "origin": "o",
+    "payload_available": "pl_avail",
+    "payload_not_available": "pl_not_avail",
+    "payload_off": "pl_off",
+    "payload_on": "pl_on",
+    "payload_press": "pl_prs",
+    "percentage_command_topic": "pct_cmd_t",
+    "percentage_state_topic": "pct_stat_t",
+    "platform": "p",
+    "retain": "ret",
+    "speed_range_max": "spd_rng_max",
+    "speed_range_min": "spd_rng_min",
+    "state_class": "stat_cla",
+    "state_off": "stat_off",
+    "state_on": "stat_on",
+    "state_topic": "stat_t",
+    "supported_color_modes": "sup_clrm",
+    "unique_id": "uniq_id",
+    "unit_of_measurement": "unit_of_meas",
+    "value_template": "val_tpl",
+}
+
+DEVICE_ABBREVIATIONS: dict[str, str] = {
+    "configuration_url": "cu",
+    "connections": "cns",
+    "hw_version": "hw",
+    "identifiers": "ids",
+    "manufacturer": "mf",
+    "model": "mdl",
+    "serial_number": "sn",
+    "suggested_area": "sa",
+    "sw_version": "sw",
+}
+
+ORIGIN_ABBREVIATIONS: dict[str, str] = {
+    "sw_version": "sw",
+    "support_url": "url",
+}
+
+
+def _rename(config: dict, table: dict[str, str]) -> dict:
+    return {table.get(key, key): value for key, value in config.items()}
+
+
+def abbreviate(config: dict) -> dict:
+    """Return a copy of a discovery `config` using the abbreviated keys.
+
+    Unknown keys are kept as they are. The nested device and origin
+    information, as well as the components of a device discovery config, are
+    abbreviated too.
+    """
+    ret = _rename(config, ABBREVIATIONS)
+    if isinstance(ret.get("dev"), dict):
+        ret["dev"] = _rename(ret["dev"], DEVICE_ABBREVIATIONS)
+    if isinstance(ret.get("o"), dict):
+        ret["o"] = _rename(ret["o"], ORIGIN_ABBREVIATIONS)
+    if isinstance(ret.get("cmps"), dict):
+        ret["cmps"] = {object_id: abbreviate(component)
+                       for object_id, component in ret["cmps"].items()}
+    return ret
@@ -0,0 +1,255 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from typing import Optional
+
+import paho.mqtt.client as mqtt
+
+from .manager import BaseMqttManager
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMqttManager(BaseMqttManager):
+    """Manager driven by an asyncio event loop.
+
+    Instead of running the paho network loop in a dedicated thread, the MQTT
+    socket is registered in the running event loop (through the external loop
+    hooks of the paho client). All the callbacks, including the ones of the
+    Things, are run in the event loop thread, so setting the `state` of a Thing
+    from a coroutine requires no cross-thread hand-off.
+
+    The `callback` methods of the Things can be either regular methods or
+    coroutines (`async def`). Coroutines are scheduled as tasks, chained per
+    Thing so that commands for the same Thing are processed in order. With an
+    `executor`, the coroutines are still run in the loop (the executor thread
+    waits for them), so the executor must be a ThreadPoolExecutor.
+
+    The paho socket hooks must only be driven from the event loop thread, so
+    the messages published from other threads (e.g. callbacks run by the
+    `executor`, or polls run by the `poll_executor`) are handed to the loop.
+
+    Usage:
+
+        manager = AsyncMqttManager(host, username=..., password=...)
+        manager.add_thing(thing)
+        await manager.run()
+    """
+    loop: Optional[asyncio.AbstractEventLoop]
+
+    def __init__(self, *args, reconnect_delay: float = 5, **kwargs):
+        """Initialize the manager. See BaseMqttManager for the parameters.
+
+        `reconnect_delay` is the amount of seconds to wait between connection
+        attempts to the MQTT broker.
+        """
+        super().__init__(*args, **kwargs)
+        # The scheduler runs in the event loop, so polls may be coroutines
+        self.scheduler.asynchronous = True
+
+        self.reconnect_delay = reconnect_delay
+        self.loop = None
+        self._loop_thread: Optional[int] = None
+        # call_later requests made before run(), scheduled once it starts
+        self._early_calls: list[tuple] = list()
+
+        self._stopping = False
+        self._disconnected: Optional[asyncio.Future] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._key_tasks: dict[str, asyncio.Task] = dict()
+        self._publish_waiters: dict[int, asyncio.Future] = dict()
+
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+        self.client.on_publish = self.on_publish
+
+    async def run(self):
+        """Connect to the broker and serve MQTT until stop() is called.
+
+        Disconnections are handled by reconnecting after `reconnect_delay`.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopping = False
+        for delay, callback, args in self._early_calls:
+            self.loop.call_later(delay, callback, *args)
+        self._early_calls.clear()
+        if self.coordinator:
+            self.client.will_set(self.availability_topic, "offline", retain=True)
+        logger.info("Starting MQTT asyncio loop")
+
+        tasks = list()
+        if self.diagnostics:
+            tasks.append(self.loop.create_task(self._diagnostics_loop()))
+        if self.scheduler.entries:
+            tasks.append(self.loop.create_task(self.scheduler.run_async()))
+
+        try:
+            await self._serve()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _serve(self):
+        while not self._stopping:
+            self._disconnected = self.loop.create_future()
+            try:
+                self.client.reconnect()
+            except OSError as e:
+                logger.warning("Could not connect to MQTT broker (%s), retrying in %ss",
+                               e, self.reconnect_delay)
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            misc = self.loop.create_task(self._misc_loop())
+            try:
+                await self._disconnected
+            finally:
+                misc.cancel()
+
+            if not self._stopping:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def stop(self):
+        """Disconnect from the broker and make run() return."""
+        self._stopping = True
+        if self.client.is_connected():
+            if self.coordinator:
+                self.client.publish(self.availability_topic, "offline", retain=True)
+            self.client.disconnect()
+        elif self._disconnected is not None and not self._disconnected.done():
+            self._disconnected.set_result(None)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _diagnostics_loop(self):
+        while True:
+            await asyncio.sleep(self.diagnostics_interval)
+            self.publish_diagnostics()
+
+    async def _misc_loop(self):
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    def on_disconnect(self, _, userdata, rc, properties=None):
+        super().on_disconnect(_, userdata, rc, properties)
+        if self._disconnected is not None and not self._disconnected.done():
+            self._disconnected.set_result(rc)
+
+    def on_publish(self, _, userdata, mid):
+        waiter = self._publish_waiters.pop(mid, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(mid)
+
+    async def async_publish(self, topic: str, payload=None, qos: int = 0,
+                            retain: bool = False) -> mqtt.MQTTMessageInfo:
+        """Publish a message and wait until it has been handed to the broker.
+
+        For QoS 0 this means that the message has been written to the socket,
+        for higher QoS levels that the broker has acknowledged it.
+        """
+        info = self.client.publish(topic, payload, qos=qos, retain=retain)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS and qos == 0:
+            raise ConnectionError("Could not publish to %s: %s"
+                                  % (topic, mqtt.error_string(info.rc)))
+
+        if not info.is_published():
+            waiter = self.loop.create_future()
+            self._publish_waiters[info.mid] = waiter
+            await waiter
+        return info
+
+    def _dispatch(self, key, callback, *args):
+        # Run a Thing callback and schedule its coroutine, if any. The deferred
+        # callbacks are already run in the loop, so no lock is needed
+        if self.dispatcher is not None:
+            # The callbacks of the Things (e.g. raw_callback) may return the
+            # coroutine of an async callback, which must be run in the loop;
+            # hence the executor must be a thread pool
+            return self.dispatcher.submit(key, self._call_threadsafe, callback, *args)
+
+        start = time.perf_counter()
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            self._schedule(key, result)
+        else:
+            self.metrics.callback_latency.observe(time.perf_counter() - start)
+
+    def call_later(self, delay: float, callback, *args):
+        """Run `callback(*args)` after `delay` seconds, in the event loop.
+
+        If the manager is not running yet, the delay counts from run().
+        """
+        if self.loop is None:
+            self._early_calls.append((delay, callback, args))
+            return
+        self.loop.call_soon_threadsafe(self.loop.call_later, delay, callback, *args)
+
+    def _update_publish_path(self):
+        # Messages published from other threads must go through publish, to
+        # be handed to the loop; there is no shortcut to the client here
+        self._plain_publish = False
+
+    def _in_other_thread(self) -> bool:
+        return self._loop_thread is not None and threading.get_ident() != self._loop_thread
+
+    def publish(self, topic: str, payload, retain: bool = False, thing=None):
+        # Messages within a batch are only kept (in the publishing thread)
+        if self._batch.messages is None and self._in_other_thread():
+            self.loop.call_soon_threadsafe(super().publish, topic, payload, retain, thing)
+            return
+        super().publish(topic, payload, retain, thing)
+
+    def _publish_messages(self, messages):
+        if self._in_other_thread():
+            self.loop.call_soon_threadsafe(super()._publish_messages, messages)
+            return
+        super()._publish_messages(messages)
+
+    def _call_threadsafe(self, callback, *args):
+        # Called from the executor threads; coroutines are sent to the loop
+        # and waited for, which keeps the per-Thing ordering of the dispatcher.
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            return asyncio.run_coroutine_threadsafe(result, self.loop).result()
+        return result
+
+    def _schedule(self, key, awaitable):
+        previous = self._key_tasks.get(key)
+        task = self.loop.create_task(self._chain(previous, awaitable))
+        self._key_tasks[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._task_done(key, t))
+
+    async def _chain(self, previous: Optional[asyncio.Task], awaitable):
+        if previous is not None:
+            await asyncio.wait([previous])
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.metrics.callback_latency.observe(time.perf_counter() - start)
+
+    def _task_done(self, key, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._key_tasks.get(key) is task:
+            del self._key_tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Callback for %s raised an exception", key, exc_info=task.exception())
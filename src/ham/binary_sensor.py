@@ -1,19 +1,15 @@
 import logging
 
+from .policy import Pollable, PublishPolicy
 from .things import Thing
 
 logger = logging.getLogger(__name__)
 
 
-class BinarySensor(Thing):
-    """Basic class for a Binary Sensor entity.
-    
-    Binary Sensors are things that only publish an ON or OFF state.
+class _BinarySensor(PublishPolicy, Pollable, Thing):
+    # Implementation of BinarySensor, shared with the slotted CompactBinarySensor
+    __slots__ = ()
 
-    This is implemented in this library through a write-only property, called
-    `state`. Other Sensor subclasses may reimplement them; the responsible of
-    publishing stuff is the Thing.publish_state method.
-    """
     device_class: str
     enabled_by_default: bool
     encoding: str
@@ -37,9 +33,24 @@ class BinarySensor(Thing):
 
     @state.setter
     def state(self, value: bool):
-        self.publish_state(value)
+        if self.should_publish(value):
+            self.publish_state(value)
 
     def get_config(self):
         config = super().get_config()
         config["state_topic"] = f'~/{ self.short_id }/main'
         return config
+
+
+class BinarySensor(_BinarySensor):
+    """Basic class for a Binary Sensor entity.
+    
+    Binary Sensors are things that only publish an ON or OFF state.
+
+    This is implemented in this library through a write-only property, called
+    `state`. Other Sensor subclasses may reimplement them; the responsible of
+    publishing stuff is the Thing.publish_state method.
+
+    Setting the state goes through the PublishPolicy of the class, which can
+    be used to avoid publishing redundant values (see PublishPolicy).
+    """
@@ -0,0 +1,108 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PayloadType = Union[bytes, str]
+
+
+class PublishBuffer:
+    """Hold the outbound messages while the manager is disconnected.
+
+    Only the latest payload of each topic is kept (states are idempotent, so
+    intermediate values are of no use after a reconnection). The buffer is
+    bounded by the amount of topics (`max_messages`) and, optionally, by the
+    total size of the payloads (`max_bytes`); when full, the messages of the
+    topics that have not been updated for the longest time are dropped.
+
+    While online, messages go straight through (see hold).
+    """
+    max_messages: int
+    max_bytes: Optional[int]
+
+    def __init__(self, max_messages: int, max_bytes: Optional[int] = None):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._messages: OrderedDict[str, tuple[PayloadType, bool]] = OrderedDict()
+        self._online = False
+
+        self.size = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def hold(self, topic: str, payload: PayloadType, retain: bool = False) -> bool:
+        """Keep the message if offline.
+
+        Return True if the message has been held (or dropped), False if the
+        caller must publish it right away.
+        """
+        with self._lock:
+            if self._online:
+                return False
+
+            previous = self._messages.pop(topic, None)
+            if previous is not None:
+                self.coalesced += 1
+                self.size -= len(previous[0])
+
+            self._messages[topic] = (payload, retain)
+            self.size += len(payload)
+
+            while self._messages and (
+                    len(self._messages) > self.max_messages
+                    or (self.max_bytes is not None and self.size > self.max_bytes)):
+                _, (dropped, _) = self._messages.popitem(last=False)
+                self.size -= len(dropped)
+                self.dropped += 1
+            return True
+
+    def hold_many(self, messages: list[tuple[str, PayloadType, bool]]
+                  ) -> list[tuple[str, PayloadType, bool]]:
+        """Same as hold, for a list of (topic, payload, retain) messages.
+
+        Return the messages that the caller must publish right away.
+        """
+        with self._lock:
+            if self._online:
+                return messages
+        return [message for message in messages if not self.hold(*message)]
+
+    def go_offline(self):
+        """Start holding the messages."""
+        with self._lock:
+            self._online = False
+
+    def drain(self) -> list[tuple[str, PayloadType, bool]]:
+        """Stop holding messages and return the held ones, oldest first."""
+        with self._lock:
+            self._online = True
+            messages = [(topic, payload, retain)
+                        for topic, (payload, retain) in self._messages.items()]
+            self._messages.clear()
+            self.size = 0
+            self.flushed += len(messages)
+
+        if messages:
+            logger.info("Flushing %d buffered messages", len(messages))
+        return messages
+
+    def stats(self) -> dict[str, int]:
+        """Return the occupation and counters of this buffer.
+
+        `coalesced` counts the messages replaced by a newer one for the same
+        topic, while `dropped` counts the messages discarded because the buffer
+        was full.
+        """
+        with self._lock:
+            return {
+                "messages": len(self._messages),
+                "bytes": self.size,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "flushed": self.flushed,
+            }
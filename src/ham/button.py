@@ -2,7 +2,6 @@ import logging
 from abc import abstractmethod
 
 from .things import Thing
-from .utils import WrapperCallback
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +30,4 @@ class Button(Thing):
         return config
 
     def set_callbacks(self):
-        self.mqtt_manager.client.message_callback_add(
-            f'{ self.mqtt_manager.base_topic }/{ self.short_id }/press',
-            WrapperCallback(self.raw_callback)
-        )
+        self.add_command_callback('press', self.raw_callback)
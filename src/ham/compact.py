@@ -0,0 +1,73 @@
+"""Slotted variants of the most common Things, for very large fleets.
+
+The instances of these classes have no __dict__, which saves a significant
+amount of memory per Thing (see benchmarks/bench_memory.py). The price is
+that no attributes other than the ones listed in `__slots__` can be set on
+the instances: the configuration (`device_class`, `unit_of_measurement`...)
+must be set as class attributes, and subclasses must declare `__slots__`
+themselves (an empty tuple is enough) to keep the savings. They share the
+implementation of the regular classes, but are not subclasses of them (e.g.
+CompactSwitch is not an instance of OptimisticSwitch), as any class without
+`__slots__` in the hierarchy would bring the __dict__ back:
+
+    class Temperature(CompactSensor):
+        __slots__ = ()
+        device_class = "temperature"
+        unit_of_measurement = "°C"
+
+    manager.add_things([Temperature("t%d" % i) for i in range(50000)])
+"""
+
+from typing import Optional
+
+from .binary_sensor import _BinarySensor
+from .number import _OptimisticNumber
+from .policy import _NOTHING
+from .sensor import _Sensor
+from .switch import _OptimisticSwitch
+
+# Instance attributes of every Thing
+_THING_SLOTS = ("name", "short_id", "mqtt_manager", "_topics", "_attributes")
+
+
+class CompactSensor(_Sensor):
+    """Sensor without per-instance __dict__."""
+    __slots__ = _THING_SLOTS + ("_last_published", "_last_publish_time")
+
+    def __init__(self, short_id: str = "", name: Optional[str] = None):
+        self.short_id = short_id
+        self.name = name if name is not None else short_id
+        # Slots do not fall back to the class defaults of PublishPolicy
+        self._last_published = _NOTHING
+        self._last_publish_time = 0.0
+
+
+class CompactBinarySensor(_BinarySensor):
+    """BinarySensor without per-instance __dict__."""
+    __slots__ = _THING_SLOTS + ("_last_published", "_last_publish_time")
+
+    def __init__(self, short_id: str = "", name: Optional[str] = None):
+        self.short_id = short_id
+        self.name = name if name is not None else short_id
+        self._last_published = _NOTHING
+        self._last_publish_time = 0.0
+
+
+class CompactSwitch(_OptimisticSwitch):
+    """OptimisticSwitch without per-instance __dict__."""
+    __slots__ = _THING_SLOTS + ("_state",)
+
+    def __init__(self, short_id: str = "", name: Optional[str] = None):
+        self.short_id = short_id
+        self.name = name if name is not None else short_id
+        self._state = False
+
+
+class CompactNumber(_OptimisticNumber):
+    """OptimisticNumber without per-instance __dict__."""
+    __slots__ = _THING_SLOTS + ("_state",)
+
+    def __init__(self, short_id: str = "", name: Optional[str] = None):
+        self.short_id = short_id
+        self.name = name if name is not None else short_id
+        self._state = 1
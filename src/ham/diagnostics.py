@@ -0,0 +1,97 @@
+import bisect
+import threading
+import time
+from typing import Optional
+
+from .sensor import Sensor
+
+
+class Histogram:
+    """Distribution of durations (in seconds) in a fixed set of buckets."""
+    bounds: tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # One bucket per bound, plus one for the values above the last bound
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg": self.total / self.count if self.count else 0.0,
+                "max": self.max,
+                "buckets": dict(zip(self.bounds + (float("inf"),), self.buckets)),
+            }
+
+
+class Metrics:
+    """Counters of the activity of a manager.
+
+    The counters are plain integers increased without locking, so they are
+    cheap to update but may miss an increment under heavy multithreading;
+    they are meant for monitoring, not for accounting.
+    """
+    def __init__(self):
+        self.started = time.monotonic()
+        self.published = 0
+        self.commands = 0
+        self.connects = 0
+        self.callback_latency = Histogram()
+
+        self._last_time = self.started
+        self._last_published = 0
+        self._last_commands = 0
+
+    def rates(self) -> tuple[float, float]:
+        """Return the publishes and commands per second since the last call."""
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        published, commands = self.published, self.commands
+        if elapsed > 0:
+            rates = ((published - self._last_published) / elapsed,
+                     (commands - self._last_commands) / elapsed)
+        else:
+            rates = (0.0, 0.0)
+
+        self._last_time = now
+        self._last_published = published
+        self._last_commands = commands
+        return rates
+
+
+class DiagnosticSensor(Sensor):
+    """Sensor reporting one of the metrics of the manager to Home Assistant."""
+    entity_category = "diagnostic"
+    state_class = "measurement"
+    float_precision = 6
+
+    def __init__(self, key: str, name: str, unit: Optional[str] = None):
+        self.key = key
+        self.name = name
+        self.short_id = "diag_%s" % key
+        if unit is not None:
+            self.unit_of_measurement = unit
+
+
+# Metrics published by the diagnostic sensors: key, name and unit
+DIAGNOSTIC_SENSORS = [
+    ("publish_rate", "Publish rate", "msg/s"),
+    ("command_rate", "Command rate", "msg/s"),
+    ("callback_latency_avg", "Callback latency", "s"),
+    ("queue_depth", "MQTT queue depth", None),
+    ("reconnects", "Reconnections", None),
+    ("discovery_duration", "Discovery duration", "s"),
+]
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+
+class DiscoveryCache:
+    """Content hashes of the discovery messages already published.
+
+    The hashes are persisted in a JSON file, so a restarted application does
+    not need to republish the (retained) discovery messages that have not
+    changed. If the broker loses its retained messages (e.g. it is restarted
+    without persistence), the cache file must be removed, or discovery must
+    be forced (see MqttManager.publish_discovery).
+    """
+    path: Union[str, os.PathLike]
+    hashes: dict[str, str]
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = path
+        self.hashes = dict()
+        self._dirty = False
+
+        try:
+            with open(path, "r") as f:
+                self.hashes = json.load(f)
+        except FileNotFoundError:
+            logger.info("Discovery cache %s not found, starting from scratch", path)
+        except (OSError, ValueError):
+            logger.warning("Discovery cache %s could not be read, ignoring it", path, exc_info=True)
+
+    @staticmethod
+    def _digest(payload: Union[str, bytes]) -> str:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        return hashlib.sha1(payload).hexdigest()
+
+    def changed(self, topic: str, payload: Union[str, bytes]) -> bool:
+        """Check if `payload` differs from the last one published on `topic`."""
+        return self.hashes.get(topic) != self._digest(payload)
+
+    def record(self, topic: str, payload: Union[str, bytes]):
+        """Record `payload` as published on `topic`.
+
+        Call this only once the message has been handed to the client, so
+        that a failed publish is retried on the next discovery.
+        """
+        digest = self._digest(payload)
+        if self.hashes.get(topic) != digest:
+            self.hashes[topic] = digest
+            self._dirty = True
+
+    def save(self):
+        """Write the cache to disk, if anything changed since the last save."""
+        if not self._dirty:
+            return
+
+        tmp_path = "%s.tmp" % (self.path,)
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.hashes, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning("Could not write the discovery cache to %s", self.path, exc_info=True)
+        else:
+            self._dirty = False
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedDispatcher:
+    """Run callbacks on an Executor, preserving the order within each key.
+
+    Callbacks submitted with the same key (the `short_id` of the Thing, when
+    used by the MqttManager) are run one after the other, in the same order in
+    which they were submitted. Callbacks with different keys are run in
+    parallel, up to the capacity of the underlying executor.
+
+    The ordering is enforced on the submitting side (only one callback per key
+    is in flight at any given time), so any Executor can be used. Note that a
+    ProcessPoolExecutor requires the callbacks and their arguments to be
+    picklable, which is not the case for the bound methods of a Thing attached
+    to a manager; use it only for standalone (module-level) handlers.
+
+    The latency of each callback is also passed to `observe`, if given.
+    """
+    executor: Executor
+
+    def __init__(self, executor: Executor, observe: Optional[Callable[[float], Any]] = None):
+        self.executor = executor
+        self.observe = observe
+
+        self._lock = threading.Lock()
+        self._queues: dict[Hashable, deque] = dict()
+
+        self.pending = 0
+        self.handled = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def submit(self, key: Hashable, fn: Callable, *args):
+        """Schedule the call `fn(*args)` after any pending call for `key`."""
+        with self._lock:
+            self.pending += 1
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.append((fn, args))
+                return
+            self._queues[key] = deque()
+
+        self._run(key, fn, args)
+
+    def _run(self, key: Hashable, fn: Callable, args: tuple):
+        started = time.monotonic()
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._done(key, f, started))
+
+    def _done(self, key: Hashable, future: Future, started: float):
+        latency = time.monotonic() - started
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Callback for %s raised an exception", key, exc_info=exc)
+
+        with self._lock:
+            self.pending -= 1
+            self.handled += 1
+            if exc is not None:
+                self.failed += 1
+            self.latency_total += latency
+            if latency > self.latency_max:
+                self.latency_max = latency
+            if self.observe is not None:
+                self.observe(latency)
+
+            queue = self._queues[key]
+            if not queue:
+                del self._queues[key]
+                return
+            fn, args = queue.popleft()
+
+        self._run(key, fn, args)
+
+    def stats(self) -> dict[str, float]:
+        """Return the queue depth and latency figures of this dispatcher.
+
+        `pending` is the amount of callbacks that have been submitted but have
+        not finished yet (including the ones being run). Latencies are in
+        seconds and are measured from the hand-off to the executor until the
+        callback finishes.
+        """
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "active_keys": len(self._queues),
+                "handled": self.handled,
+                "failed": self.failed,
+                "latency_avg": self.latency_total / self.handled if self.handled else 0.0,
+                "latency_max": self.latency_max,
+            }
+
+
+class Debouncer:
+    """Coalesce bursts of calls, so that only the latest one is run.
+
+    The first call opens a window of `window` seconds. With the "trailing"
+    edge, the call is deferred until the window closes, and only the latest
+    arguments received within the window are used. With the "leading" edge,
+    the first call is run right away and the rest of the window is ignored.
+    With "both", the first call is run right away, and the latest one (if
+    there were more calls) when the window closes.
+
+    Deferred calls are run through the `dispatch_deferred` of the manager,
+    with `key` as ordering key (so that they are run in sequence with the
+    other callbacks of the Thing, and not counted again as commands), after
+    the delay provided by the manager `call_later`.
+    """
+    EDGES = ("leading", "trailing", "both")
+
+    def __init__(self, callback: Callable, window: float, manager, key: Hashable,
+                 edge: str = "trailing"):
+        if edge not in self.EDGES:
+            raise ValueError("Unknown debounce edge: %s" % edge)
+
+        self.callback = callback
+        self.window = window
+        self.manager = manager
+        self.key = key
+        self.leading = edge in ("leading", "both")
+        self.trailing = edge in ("trailing", "both")
+
+        self._lock = threading.Lock()
+        self._open = False
+        self._pending = None
+        self.coalesced = 0
+
+    def __call__(self, *args):
+        with self._lock:
+            if self._open:
+                if self._pending is not None or not self.trailing:
+                    self.coalesced += 1
+                self._pending = args if self.trailing else None
+                return
+            self._open = True
+            self._pending = None if self.leading else args
+        self.manager.call_later(self.window, self._close)
+
+        if self.leading:
+            return self.callback(*args)
+
+    def _close(self):
+        with self._lock:
+            args, self._pending = self._pending, None
+            self._open = False
+        if args is not None:
+            self.manager.dispatch_deferred(self.key, self.callback, *args)
@@ -0,0 +1,244 @@
+import itertools
+import logging
+import threading
+from typing import Callable, Optional
+
+import paho.mqtt.client as mqtt
+
+logger = logging.getLogger(__name__)
+
+
+def _to_bytes(payload) -> bytes:
+    # Same conversions as paho's Client.publish
+    if payload is None:
+        return b""
+    if isinstance(payload, bytes):
+        return payload
+    if isinstance(payload, bytearray):
+        return bytes(payload)
+    if isinstance(payload, str):
+        return payload.encode("utf-8")
+    if isinstance(payload, (int, float)):
+        return str(payload).encode("ascii")
+    raise TypeError("payload must be a string, bytearray, int, float or None.")
+
+
+def _unshare(sub: str) -> str:
+    # "$share/<group>/<filter>" -> "<filter>"
+    if sub.startswith("$share/"):
+        return sub.split("/", 2)[2]
+    return sub
+
+
+class FakeBroker:
+    """In-memory MQTT broker for FakeClient instances.
+
+    Messages are delivered synchronously, in the thread that publishes them,
+    to every connected client with a matching subscription (wildcards are
+    supported). Retained messages are stored and sent on subscription, and an
+    empty retained payload clears the topic, as in a real broker.
+
+    `published` counts all the messages received by the broker, and
+    `retained` holds the current retained payloads indexed by topic.
+    """
+    retained: dict[str, bytes]
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients: list["FakeClient"] = list()
+        self.retained = dict()
+        self.published = 0
+
+    def connect(self, client: "FakeClient"):
+        with self._lock:
+            if client not in self._clients:
+                self._clients.append(client)
+
+    def disconnect(self, client: "FakeClient"):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def publish(self, topic: str, payload: bytes, qos: int = 0, retain: bool = False):
+        with self._lock:
+            self.published += 1
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            receivers = [client for client in self._clients if client.is_subscribed(topic)]
+
+        for client in receivers:
+            client.deliver(topic, payload, qos, False)
+
+    def subscribe(self, client: "FakeClient", sub: str):
+        """Send the retained messages matching `sub` to `client`."""
+        with self._lock:
+            retained = [(topic, payload) for topic, payload in self.retained.items()
+                        if mqtt.topic_matches_sub(sub, topic)]
+
+        for topic, payload in retained:
+            client.deliver(topic, payload, 0, True)
+
+
+class FakeClient:
+    """Drop-in replacement of paho's Client connected to a FakeBroker.
+
+    Only the subset of the paho API used by the managers is implemented. Pass
+    it as the `client` of a MqttManager to run it without a network:
+
+        broker = FakeBroker()
+        manager = MqttManager(client=FakeClient(broker), node_id="test")
+        manager.add_thing(thing)
+        manager.client.connect()  # or manager.start()
+
+    drop_connection can be used to simulate a network failure. MQTT v5
+    properties are accepted (and ignored), and shared subscriptions behave as
+    regular subscriptions.
+    """
+    on_connect: Optional[Callable]
+    on_disconnect: Optional[Callable]
+    on_message: Optional[Callable]
+    on_publish: Optional[Callable]
+
+    def __init__(self, broker: FakeBroker, userdata=None):
+        self.broker = broker
+        self.userdata = userdata
+
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self.on_publish = None
+
+        self._connected = False
+        self._subscriptions: dict[str, int] = dict()
+        self._wildcards: list[str] = list()
+        self._callbacks: dict[str, Callable] = dict()
+        self._will: Optional[tuple[str, bytes, int, bool]] = None
+        self._mid = itertools.count(1)
+
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+
+    # Connection handling
+
+    def username_pw_set(self, username, password=None):
+        pass
+
+    def will_set(self, topic: str, payload=None, qos: int = 0, retain: bool = False):
+        self._will = (topic, _to_bytes(payload), qos, retain)
+
+    def connect_async(self, host, port=1883, keepalive=60, bind_address="", **kwargs):
+        # The broker is given on construction; connection happens on loop_forever
+        pass
+
+    def connect(self, *args, **kwargs) -> int:
+        """Connect to the broker and call on_connect (synchronously)."""
+        self.broker.connect(self)
+        self._connected = True
+        if self.on_connect is not None:
+            self.on_connect(self, self.userdata, {"session present": 0}, mqtt.MQTT_ERR_SUCCESS)
+        return mqtt.MQTT_ERR_SUCCESS
+
+    reconnect = connect
+
+    def disconnect(self, *args, **kwargs) -> int:
+        """Disconnect cleanly (the will is not sent) and stop loop_forever."""
+        self._stopped.set()
+        self._close(mqtt.MQTT_ERR_SUCCESS)
+        self._wakeup.set()
+        return mqtt.MQTT_ERR_SUCCESS
+
+    def drop_connection(self):
+        """Simulate an unexpected disconnection; the will is published."""
+        if self._will is not None:
+            self.broker.publish(*self._will)
+        self._close(mqtt.MQTT_ERR_CONN_LOST)
+
+    def _close(self, rc: int):
+        if not self._connected:
+            return
+        self._connected = False
+        self.broker.disconnect(self)
+        if self.on_disconnect is not None:
+            self.on_disconnect(self, self.userdata, rc)
+        self._wakeup.set()
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def loop_forever(self, timeout=1.0, max_packets=1, retry_first_connection=False):
+        """Keep connected (reconnecting after drops) until disconnect is called."""
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            if not self._connected:
+                self.connect()
+            self._wakeup.wait()
+        return mqtt.MQTT_ERR_SUCCESS
+
+    def loop_misc(self) -> int:
+        return mqtt.MQTT_ERR_SUCCESS if self._connected else mqtt.MQTT_ERR_NO_CONN
+
+    # Messages
+
+    def publish(self, topic: str, payload=None, qos: int = 0,
+                retain: bool = False, properties=None) -> mqtt.MQTTMessageInfo:
+        info = mqtt.MQTTMessageInfo(next(self._mid))
+        if not self._connected:
+            info.rc = mqtt.MQTT_ERR_NO_CONN
+            return info
+
+        self.broker.publish(topic, _to_bytes(payload), qos, retain)
+        info._set_as_published()
+        if self.on_publish is not None:
+            self.on_publish(self, self.userdata, info.mid)
+        return info
+
+    def subscribe(self, topic, qos: int = 0) -> tuple[int, int]:
+        # Same signatures as paho: a topic string or a list of (topic, qos)
+        subs = topic if isinstance(topic, list) else [(topic, qos)]
+        # Shared subscriptions are handled as regular ones
+        subs = [(_unshare(sub), sub_qos) for sub, sub_qos in subs]
+        for sub, sub_qos in subs:
+            self._subscriptions[sub] = sub_qos
+        self._update_wildcards()
+        for sub, _ in subs:
+            self.broker.subscribe(self, sub)
+        return mqtt.MQTT_ERR_SUCCESS, next(self._mid)
+
+    def unsubscribe(self, topic) -> tuple[int, int]:
+        for sub in (topic if isinstance(topic, list) else [topic]):
+            self._subscriptions.pop(_unshare(sub), None)
+        self._update_wildcards()
+        return mqtt.MQTT_ERR_SUCCESS, next(self._mid)
+
+    def message_callback_add(self, sub: str, callback: Callable):
+        self._callbacks[sub] = callback
+
+    def message_callback_remove(self, sub: str):
+        self._callbacks.pop(sub, None)
+
+    def is_subscribed(self, topic: str) -> bool:
+        if topic in self._subscriptions:
+            return True
+        return any(mqtt.topic_matches_sub(sub, topic) for sub in self._wildcards)
+
+    def _update_wildcards(self):
+        self._wildcards = [sub for sub in self._subscriptions if "+" in sub or "#" in sub]
+
+    def deliver(self, topic: str, payload: bytes, qos: int, retain: bool):
+        """Hand a message from the broker to the callbacks, as paho does."""
+        msg = mqtt.MQTTMessage(topic=topic.encode("utf-8"))
+        msg.payload = payload
+        msg.qos = qos
+        msg.retain = retain
+
+        matched = False
+        for sub, callback in list(self._callbacks.items()):
+            if mqtt.topic_matches_sub(sub, topic):
+                matched = True
+                callback(self, self.userdata, msg)
+
+        if not matched and self.on_message is not None:
+            self.on_message(self, self.userdata, msg)
@@ -1,8 +1,8 @@
 from abc import abstractmethod
 import logging
 
+from .serialization import encode_state
 from .things import Thing
-from .utils import WrapperCallback
 
 logger = logging.getLogger(__name__)
 
@@ -48,14 +48,13 @@ class Fan(Thing):
         return config
 
     def set_callbacks(self):
-        self.mqtt_manager.client.message_callback_add(
-            f'{ self.mqtt_manager.base_topic }/{ self.short_id }/set',
-            WrapperCallback(self.raw_callback)
-        )
+        self.add_command_callback('set', self.raw_callback)
 
 
 class BinaryOptimisticFan(Fan):
     """A fan that tracks its own on/off state."""
+    persistent_fields = ("_state",)
+
     @property
     def state(self):
         return self._state
@@ -63,6 +62,7 @@ class BinaryOptimisticFan(Fan):
     @state.setter
     def state(self, value: bool):
         self._state = value
+        self.persist("_state", value)
         self.publish_state(self._state)
 
     def callback(self, state: bool):
@@ -81,6 +81,8 @@ class PercentageOptimisticFan(BinaryOptimisticFan):
     speed_range_max = 100
     _speed = 1
 
+    persistent_fields = ("_state", "_speed")
+
     @property
     def speed(self):
         return self._speed
@@ -94,15 +96,20 @@ class PercentageOptimisticFan(BinaryOptimisticFan):
             self.state = True
 
             self._speed = value
-            self.publish_mqtt_message(bytes(str(value), "utf-8"), "speed/state")
+            self.persist("_speed", value)
+            self.publish_mqtt_message(encode_state(value), "speed/state")
             self.publish_state(self._state)
 
+    def publish_restored(self):
+        self.publish_mqtt_message(encode_state(self._speed), "speed/state")
+        super().publish_restored()
+
     def speed_callback(self, speed: int):
         self.speed = speed
 
     def raw_speed_callback(self, topic: str, raw_speed: bytes):
         print("Hey!")
-        self.speed_callback(int(raw_speed.decode("utf-8")))
+        return self.speed_callback(int(raw_speed.decode("utf-8")))
 
     def get_config(self):
         config = super().get_config()
@@ -112,7 +119,6 @@ class PercentageOptimisticFan(BinaryOptimisticFan):
 
     def set_callbacks(self):
         super().set_callbacks()        
-        self.mqtt_manager.client.message_callback_add(
-            f'{ self.mqtt_manager.base_topic }/{ self.short_id }/speed/set',
-            WrapperCallback(self.raw_speed_callback)
-        )
+        # Only the speed commands are debounced
+        self.add_command_callback('speed/set', self.raw_speed_callback,
+                                  debounce=self.debounce, debounce_edge=self.debounce_edge)
@@ -0,0 +1,194 @@
+"""Declarative definition of Things, loaded from a fleet file.
+
+A fleet file (TOML, YAML or JSON) lists the Things of the manager device and
+of any number of additional devices. For example, in TOML:
+
+    [[things]]
+    component = "sensor"
+    short_id = "cpu_temp"
+    name = "CPU temperature"
+    device_class = "temperature"
+    unit_of_measurement = "°C"
+
+    [[devices]]
+    name = "Relay board"
+    identifiers = ["relay_board_01"]
+
+      [[devices.things]]
+      component = "switch"
+      count = 8
+      short_id = "relay{index}"
+      name = "Relay {index}"
+
+Each Thing has a `component` (see COMPONENTS) or a `class` ("module:Class",
+or a name given in the `classes` argument), a `short_id`, a `name` and any of
+the `config_fields` of its class, as well as its rate limit (`rate_limit`,
+`rate_limit_burst` and `rate_limit_policy`) and, for the classes with a
+PublishPolicy (e.g. sensors), its publish policy (`skip_unchanged`,
+`deadband`, `deadband_relative`, `min_interval` and `max_silence`). With
+`count`, that many Things are created, and `{index}` is replaced in their
+`short_id` and `name`.
+
+The classes must be instantiable without arguments. A subclass is created
+for each definition, holding its config_fields (rate limit and publish policy)
+values as class attributes.
+"""
+
+import importlib
+import json
+import os
+import types
+from typing import Any, Optional, Union, TYPE_CHECKING
+
+from .compact import CompactBinarySensor, CompactNumber, CompactSensor, CompactSwitch
+from .fan import BinaryOptimisticFan
+from .policy import PublishPolicy
+from .things import Thing
+
+if TYPE_CHECKING:
+    from ham.manager import BaseMqttManager, DeviceInfo
+
+
+# Default classes for each component; components requiring an application
+# callback (e.g. buttons or lights) must be given an explicit `class`
+COMPONENTS: dict[str, type[Thing]] = {
+    "binary_sensor": CompactBinarySensor,
+    "fan": BinaryOptimisticFan,
+    "number": CompactNumber,
+    "sensor": CompactSensor,
+    "switch": CompactSwitch,
+}
+
+_THING_KEYS = {"component", "class", "short_id", "name", "count"}
+_RATE_LIMIT_KEYS = {"rate_limit", "rate_limit_burst", "rate_limit_policy"}
+_POLICY_KEYS = {"skip_unchanged", "deadband", "deadband_relative", "min_interval", "max_silence"}
+_DEVICE_KEYS = {"configuration_url", "connections", "hw_version", "identifiers",
+                "manufacturer", "model", "name", "suggested_area", "sw_version",
+                "via_device"}
+
+
+def read_fleet_file(path: Union[str, os.PathLike]) -> dict:
+    """Parse a fleet file, according to its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("Reading TOML fleet files requires the tomli package") from None
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    elif ext in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Reading YAML fleet files requires the PyYAML package") from None
+        with open(path, "r") as f:
+            return yaml.safe_load(f) or dict()
+    elif ext == ".json":
+        with open(path, "r") as f:
+            return json.load(f)
+    raise ValueError("Unsupported fleet file extension: %s" % ext)
+
+
+def _resolve_class(definition: dict, classes: dict[str, type[Thing]]) -> type[Thing]:
+    if "class" in definition:
+        name = definition["class"]
+        if name in classes:
+            return classes[name]
+        module_name, sep, attr = name.partition(":")
+        if not sep:
+            raise ValueError("Unknown class %r (expected 'module:Class')" % name)
+        return getattr(importlib.import_module(module_name), attr)
+
+    try:
+        return COMPONENTS[definition["component"]]
+    except KeyError:
+        raise ValueError("Thing definition needs a valid `component` or a `class`: %r"
+                         % definition) from None
+
+
+def _build_things(definitions: list[dict], classes: dict[str, type[Thing]]) -> list[Thing]:
+    things = list()
+    for definition in definitions:
+        cls = _resolve_class(definition, classes)
+
+        fields = {key: value for key, value in definition.items() if key not in _THING_KEYS}
+        unknown = set(fields).difference(cls.config_fields, _RATE_LIMIT_KEYS)
+        if issubclass(cls, PublishPolicy):
+            unknown.difference_update(_POLICY_KEYS)
+        if unknown:
+            raise ValueError("Unknown fields for %s: %s"
+                             % (cls.__name__, ", ".join(sorted(unknown))))
+
+        namespace = {"__module__": cls.__module__, **fields}
+        if isinstance(getattr(cls, "short_id", None), types.MemberDescriptorType):
+            # Keep slotted classes (see ham.compact) without __dict__
+            namespace["__slots__"] = ()
+        thing_cls = type(cls.__name__, (cls,), namespace)
+
+        count = definition.get("count")
+        for index in range(count if count is not None else 1):
+            thing = thing_cls()
+            if count is None:
+                thing.short_id = definition["short_id"]
+                thing.name = definition.get("name", thing.short_id)
+            else:
+                thing.short_id = definition["short_id"].format(index=index)
+                thing.name = definition.get("name", definition["short_id"]).format(index=index)
+            things.append(thing)
+    return things
+
+
+def build_fleet(fleet: dict[str, Any], classes: Optional[dict[str, type[Thing]]] = None
+                ) -> list[tuple[Optional["DeviceInfo"], list[Thing]]]:
+    """Build the Things of a parsed fleet definition, grouped by device.
+
+    The Things of the manager device have `None` as device. Duplicated
+    short_id (and thus unique_id) are rejected.
+    """
+    classes = classes or dict()
+
+    groups = [(None, _build_things(fleet.get("things", []), classes))]
+    for device in fleet.get("devices", []):
+        info = {key: value for key, value in device.items() if key != "things"}
+        unknown = set(info).difference(_DEVICE_KEYS)
+        if unknown:
+            raise ValueError("Unknown device fields: %s" % ", ".join(sorted(unknown)))
+        if "connections" in info:
+            info["connections"] = [tuple(connection) for connection in info["connections"]]
+        groups.append((info, _build_things(device.get("things", []), classes)))
+
+    seen = set()
+    for _, things in groups:
+        for thing in things:
+            if thing.short_id in seen:
+                raise ValueError("Duplicated short_id in fleet: %s" % thing.short_id)
+            seen.add(thing.short_id)
+    return groups
+
+
+def load_fleet(manager: "BaseMqttManager", path: Union[str, os.PathLike],
+               classes: Optional[dict[str, type[Thing]]] = None) -> list[Thing]:
+    """Read a fleet file and add all its Things to `manager`.
+
+    Return the list of Things added. See the module documentation for the
+    format of the file.
+    """
+    groups = build_fleet(read_fleet_file(path), classes)
+
+    registered = {thing.short_id for _, thing in manager.things}
+    for _, things in groups:
+        for thing in things:
+            if thing.short_id in registered:
+                raise ValueError("short_id already registered in the manager: %s"
+                                 % thing.short_id)
+
+    added = list()
+    for origin, things in groups:
+        manager.add_things(things, origin)
+        added.extend(things)
+    return added
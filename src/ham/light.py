@@ -1,9 +1,8 @@
 from abc import abstractmethod
-import json
 from typing import Optional
 
+from .serialization import loads
 from .things import Thing
-from .utils import WrapperCallback
 
 
 class Light(Thing):
@@ -30,7 +29,7 @@ class Light(Thing):
         pass
 
     def raw_callback(self, topic, payload):
-        self.callback(**json.loads(payload))
+        return self.callback(**loads(payload))
 
     def get_config(self):
         config = super().get_config()
@@ -38,10 +37,7 @@ class Light(Thing):
         return config
 
     def set_callbacks(self):
-        self.mqtt_manager.client.message_callback_add(
-            f'{ self.mqtt_manager.base_topic }/{ self.short_id }/set',
-            WrapperCallback(self.raw_callback)
-        )
+        self.add_command_callback('set', self.raw_callback)
 
 
 class DimmableLight(Light):
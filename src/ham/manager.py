@@ -1,14 +1,30 @@
 import logging
 from collections import defaultdict
-from threading import Thread
-from typing import TypedDict, Optional
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from threading import Lock, RLock, Thread, Timer, local
+from typing import Any, Callable, Iterable, Iterator, TypedDict, Optional, Union
 
 from getmac import get_mac_address
 import paho.mqtt.client as mqtt
-import json
 
+import os
+import random
+import re
 import socket
-
+import time
+
+from .abbreviations import abbreviate
+from .buffer import PublishBuffer
+from .diagnostics import DIAGNOSTIC_SENSORS, DiagnosticSensor, Metrics
+from .discovery import DiscoveryCache
+from .dispatch import KeyedDispatcher
+from .mqtt5 import TopicAliases
+from .ratelimit import RateLimiter
+from .scheduler import PollScheduler
+from .sharding import shard_of
+from .statestore import LogStateStore, StateStore
+from .serialization import dumps, encode_state
 from .things import Thing
 
 from . import __version__
@@ -16,6 +32,13 @@ from . import __version__
 
 logger = logging.getLogger(__name__)
 
+
+class _BatchState(local):
+    # Class-level default, so that reading it outside of a batch is a plain
+    # attribute lookup (a missing attribute on a local() raises internally)
+    messages: Optional[dict] = None
+
+
 class DeviceInfo(TypedDict, total=False):
     configuration_url: str
     connections: list[tuple[str, str]]
@@ -29,18 +52,51 @@ class DeviceInfo(TypedDict, total=False):
     via_device: str
 
 
-class MqttManager(Thread):
+class BaseMqttManager:
+    """Common logic for the managers, regardless of how the MQTT loop is run.
+
+    See MqttManager (threaded) and AsyncMqttManager (asyncio).
+    """
     things: list[tuple[Optional[DeviceInfo], Thing]]
     client: mqtt.Client
     node_id: str
     base_topic: str
     name: str
     unique_identifier: str
+    dispatcher: Optional[KeyedDispatcher]
+    routes: dict[str, Callable]
+    discovery_cache: Optional[DiscoveryCache]
+    discovery_stats: dict[str, float]
+    device_discovery: bool
+    compact_discovery: bool
+    outbound: Optional[PublishBuffer]
+    metrics: Metrics
+    diagnostics: list[DiagnosticSensor]
+    scheduler: PollScheduler
+    state_cache: Optional[dict[str, tuple[Any, bool]]]
+    limiter: RateLimiter
+    aliases: Optional[TopicAliases]
+    state_store: Optional[StateStore]
 
     def __init__(self, host='localhost', port=1883, username=None,
                  password=None, *, node_id=None, base_topic=None,
                  discovery_prefix='homeassistant', name=None,
-                 unique_identifier=None):
+                 unique_identifier=None, executor: Optional[Executor] = None,
+                 discovery_cache: Optional[str] = None,
+                 device_discovery: bool = False, compact_discovery: bool = False,
+                 offline_buffer: Optional[int] = None,
+                 offline_buffer_bytes: Optional[int] = None,
+                 client: Optional[mqtt.Client] = None,
+                 poll_executor: Optional[Executor] = None,
+                 replay_on_birth: bool = False, replay_rate: float = 200,
+                 replay_jitter: float = 5, rate_limit: Optional[float] = None,
+                 rate_limit_burst: Optional[float] = None,
+                 rate_limit_policy: str = "delay",
+                 discovery_rate: Optional[float] = None,
+                 protocol: int = mqtt.MQTTv311, share_group: Optional[str] = None,
+                 shard_index: int = 0, shard_count: int = 1,
+                 coordinator: Optional[bool] = None,
+                 state_store: Union[str, os.PathLike, StateStore, None] = None):
         """Initialize connection to the MQTT the server.
 
         This will prepare the MQTT connection using the provided configuration
@@ -60,12 +116,86 @@ class MqttManager(Thread):
         (recommended). Set this ONLY if the MAC of the host is erratic (e.g. if
         you are using certain ARM single-board-computers that are MACless, 
         or if you are deploying into kubernetes).
+
+        By default, the callbacks of the Things are run in the MQTT network
+        thread, which means that a slow callback stalls the whole MQTT loop.
+        If an `executor` (e.g. a concurrent.futures.ThreadPoolExecutor) is
+        provided, callbacks will be handed off to it. Callbacks for the same
+        Thing are still run in order, while different Things are processed in
+        parallel. See the `dispatcher` attribute for queue and latency stats.
+
+        If `discovery_cache` is set to a file path, the hashes of the published
+        discovery messages are stored there, and on (re)connection only the
+        discovery messages that changed are published again.
+
+        If `device_discovery` is set, a single discovery message is published
+        for each device (the manager device and every `origin` given to
+        add_thing) containing all of its Things, instead of one message per
+        Thing. Note that Home Assistant will not remove the per-Thing discovery
+        messages published before switching to this mode; clear their
+        retained messages (or start with a new `node_id`) to avoid duplicates.
+
+        If `compact_discovery` is set, the discovery messages use the
+        abbreviated keys understood by Home Assistant (e.g. `stat_t` instead
+        of `state_topic`) and no whitespace, resulting in smaller payloads.
+
+        If `offline_buffer` is set, the messages published by the Things while
+        the manager is not connected are held (only the latest one for each
+        topic, up to `offline_buffer` topics and `offline_buffer_bytes` bytes)
+        and sent once the connection is established and discovery is done.
+        See the `outbound` attribute for the buffer stats.
+
+        The activity of the manager is tracked in the `metrics` attribute; see
+        get_metrics and add_diagnostics.
+
+        A `client` can be given instead of letting the manager create a paho
+        Client, e.g. a ham.fake.FakeClient for running without a broker.
+
+        Things with a `poll_interval` and a `poll` method are polled by the
+        `scheduler` of the manager. Polls are run in the scheduler thread (or
+        event loop), unless a `poll_executor` is given for blocking reads.
+
+        If `replay_on_birth` is set, the manager keeps the last message of
+        each state and attributes topic, and listens to the birth message of
+        Home Assistant (`<discovery_prefix>/status`). When Home Assistant comes
+        back online, after a random delay of up to `replay_jitter` seconds,
+        the discovery messages and the cached messages are published again,
+        at most `replay_rate` messages per second.
+
+        If `rate_limit` is set, the Things can publish at most that amount of
+        messages per second altogether (in bursts of up to `rate_limit_burst`
+        messages). The messages beyond the limit are dropped, delayed or
+        coalesced according to `rate_limit_policy`. Things can also be limited
+        individually through their `rate_limit` class attributes. See the
+        `limiter` attribute for the counters. If `discovery_rate` is set, the
+        discovery messages are published at most at that rate.
+
+        With `protocol=paho.mqtt.client.MQTTv5`, the manager connects using
+        MQTT 5 and publishes the states through topic aliases (see
+        ham.mqtt5.TopicAliases and the `aliases` attribute); the states of
+        Things with an `expire_after` are published with a matching message
+        expiry, so that stale states are not delivered late.
+
+        If `share_group` is set, the command topics are subscribed as shared
+        subscriptions (`$share/<share_group>/...`), so the broker delivers each
+        command to only one of the managers subscribed with the same group.
+
+        The Things of a node can be split across `shard_count` managers (e.g.
+        processes or replicas), each one with a different `shard_index`, see
+        ham.sharding. The `coordinator` (by default, shard 0) is the only one
+        publishing the discovery messages and the availability of the node.
+
+        If `state_store` is set (to a file path, for a ham.statestore.LogStateStore,
+        or to a StateStore instance), the state of the optimistic Things (see
+        their `persistent_fields`) is saved there on every change, restored
+        when they are added to the manager and published on connection. When
+        sharding, each shard needs its own store.
         """
         super().__init__()
 
         logger.info("Initializing MqttManager; MQTT on %s:%s", host, port)
 
-        self.client = mqtt.Client()
+        self.client = client if client is not None else mqtt.Client(protocol=protocol)
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
         self.client.on_disconnect = self.on_disconnect
@@ -101,6 +231,49 @@ class MqttManager(Thread):
             self.name = self.node_id
 
         self.things = list()
+        self.routes = dict()
+        self.discovery_cache = DiscoveryCache(discovery_cache) if discovery_cache else None
+        self.discovery_stats = dict()
+        self.device_discovery = device_discovery
+        self.compact_discovery = compact_discovery
+        self.outbound = (PublishBuffer(offline_buffer, offline_buffer_bytes)
+                         if offline_buffer is not None else None)
+        self.metrics = Metrics()
+        # The latency is measured on the submitting side, so that only the
+        # callback itself is sent to the executor (it may be a process pool)
+        self.dispatcher = (KeyedDispatcher(executor, self.metrics.callback_latency.observe)
+                           if executor is not None else None)
+        # Without executor, the callbacks deferred to a timer thread (see
+        # Debouncer) take the lock of their Thing, as the inline ones do
+        self._key_locks = defaultdict(RLock)
+        self.diagnostics = list()
+        self.diagnostics_interval = 60.0
+        self._batch = _BatchState()
+        # Amount of threads within a batch, to keep publish fast otherwise
+        self._batches = 0
+        self._batches_lock = Lock()
+        self.scheduler = PollScheduler(poll_executor)
+        self.replay_rate = replay_rate
+        self.replay_jitter = replay_jitter
+        self.state_cache = dict() if replay_on_birth else None
+        self.limiter = RateLimiter(self._send_messages, self.call_later,
+                                   rate_limit, rate_limit_burst, rate_limit_policy)
+        self.discovery_rate = discovery_rate
+        self.aliases = TopicAliases(self.client) if protocol == mqtt.MQTTv5 else None
+        self._update_publish_path()
+        self.share_group = share_group
+        if not 0 <= shard_index < shard_count:
+            raise ValueError("Invalid shard %d of %d" % (shard_index, shard_count))
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.coordinator = coordinator if coordinator is not None else shard_index == 0
+        if state_store is not None and not isinstance(state_store, StateStore):
+            state_store = LogStateStore(state_store)
+        self.state_store = state_store
+        self._stored_states = state_store.load() if state_store is not None else dict()
+        self._restored: list[Thing] = list()
+        if replay_on_birth:
+            self.add_route(self.ha_status_topic, self.on_ha_status)
         self.unique_identifier = unique_identifier or self.get_mac()
         self.device_info = self._gen_device_info()
 
@@ -110,27 +283,211 @@ class MqttManager(Thread):
     def add_thing(self, thing: Thing, origin: Optional[DeviceInfo] = None):
         self.things.append((origin, thing))
         thing.set_manager(self)
+        if not self.owns(thing):
+            # Handled by another shard; only needed for discovery
+            return
+        values = self._stored_states.get(thing.short_id)
+        if values and thing.persistent_fields:
+            thing.restore(values)
+            self._restored.append(thing)
+        thing.set_callbacks()
+        self.limiter.add_thing(thing)
+        self._update_publish_path()
+        if self.aliases is not None:
+            self.aliases.set_expiry(thing.topic("main"), getattr(thing, "expire_after", None))
+        if getattr(thing, "poll_interval", None) is not None:
+            self.scheduler.add(thing)
 
     def add_things(self, things: list[Thing], origin: Optional[DeviceInfo] = None):
         for thing in things:
-            self.things.append((origin, thing))
-            thing.set_manager(self)
+            self.add_thing(thing, origin)
 
-    def run(self):
-        self.client.will_set(self.availability_topic, "offline", retain=True)
-        logger.info("Starting MQTT client loop")
-        self.client.loop_forever(retry_first_connection=True)
+    def owns(self, thing: Thing) -> bool:
+        """Check if `thing` belongs to the shard of this manager."""
+        return (self.shard_count == 1
+                or shard_of(thing.short_id, self.shard_count) == self.shard_index)
+
+    @property
+    def owned_things(self) -> list[Thing]:
+        """The Things handled by this manager (all of them, unless sharded)."""
+        return [thing for _, thing in self.things if self.owns(thing)]
+
+    def add_route(self, topic: str, handler: Callable):
+        """Route the messages received on the exact `topic` to `handler`.
+
+        The handler is called with the same arguments as a paho on_message
+        callback (client, userdata and message).
+        """
+        if topic in self.routes:
+            logger.warning("Overriding the route for topic %s", topic)
+        self.routes[topic] = handler
+
+    def dispatch(self, key, callback, *args):
+        """Run a Thing callback, either inline or through the executor.
+
+        `key` identifies the ordering domain of the callback (the `short_id`
+        of the Thing).
+        """
+        self.metrics.commands += 1
+        return self._dispatch(key, callback, *args)
+
+    def dispatch_deferred(self, key, callback, *args):
+        """Run a deferred Thing callback (see ham.dispatch.Debouncer).
 
-    def on_disconnect(self, _, userdata, rc):
+        It is run in sequence with the other callbacks of `key`, like the
+        ones of dispatch, but it is not counted as a command.
+        """
+        return self._dispatch(key, callback, *args)
+
+    def _dispatch(self, key, callback, *args):
+        if self.dispatcher is None:
+            with self._key_locks[key]:
+                return self._timed(callback, *args)
+        self.dispatcher.submit(key, callback, *args)
+
+    def call_later(self, delay: float, callback: Callable, *args):
+        """Run `callback(*args)` after `delay` seconds, in a timer thread."""
+        timer = Timer(delay, callback, args)
+        timer.daemon = True
+        timer.start()
+
+    def _timed(self, callback, *args):
+        start = time.perf_counter()
+        try:
+            return callback(*args)
+        finally:
+            self.metrics.callback_latency.observe(time.perf_counter() - start)
+
+    def _update_publish_path(self):
+        # Without replay, rate limits, offline buffer, topic aliases or open
+        # batches, publish skips all of them and goes straight to the client
+        self._plain_publish = (self.state_cache is None and self.outbound is None
+                               and self.aliases is None and self.limiter.bucket is None
+                               and not self.limiter.limits and not self._batches)
+
+    def publish(self, topic: str, payload, retain: bool = False, thing: Optional[Thing] = None):
+        """Publish a message, or hold it if offline (see `offline_buffer`).
+
+        The message is subject to the rate limits (see `rate_limit`), those of
+        `thing` included if given. Within a batch (see the batch method), the
+        message is kept until the batch ends.
+        """
+        if self._plain_publish:
+            self.metrics.published += 1
+            self.client.publish(topic, payload, 0, retain)
+            return
+
+        pending = self._batch.messages
+        if pending is not None:
+            pending[topic] = (payload, retain, thing)
+            return
+
+        if self.state_cache is not None:
+            self.state_cache[topic] = (payload, retain)
+        if not self.limiter.admit(topic, payload, retain, thing):
+            return
+        self.metrics.published += 1
+        if self.outbound is not None and self.outbound.hold(topic, payload, retain):
+            return
+        if self.aliases is not None:
+            self.aliases.publish(topic, payload, retain)
+        else:
+            self.client.publish(topic, payload, retain=retain)
+
+    def _publish_messages(self, messages: list[tuple[str, Any, bool, Optional[Thing]]]):
+        if self.state_cache is not None:
+            for topic, payload, retain, _ in messages:
+                self.state_cache[topic] = (payload, retain)
+        self._send_messages(self.limiter.admit_many(messages))
+
+    def _send_messages(self, messages: list[tuple[str, Any, bool]]):
+        self.metrics.published += len(messages)
+        if self.outbound is not None:
+            messages = self.outbound.hold_many(messages)
+
+        publish = self.client.publish if self.aliases is None else self.aliases.publish
+        for topic, payload, retain in messages:
+            publish(topic, payload, retain=retain)
+
+    def publish_many(self, states: Iterable[tuple[Thing, Any]] = (),
+                     attributes: Iterable[tuple[Thing, dict]] = ()):
+        """Publish the states and attributes of many Things at once.
+
+        `states` and `attributes` are iterables of (thing, value) pairs (e.g.
+        the items() of a dict indexed by Thing). This is equivalent to calling
+        publish_state and setting `attributes` for each of them (so the state
+        of optimistic Things and publish policies are not involved, but rate
+        limits are), but the payloads are encoded in a single pass and sent
+        together.
+        """
+        messages = [(thing.topic("main"), encode_state(state, thing.float_precision), False, thing)
+                    for thing, state in states]
+        for thing, attrs in attributes:
+            # Recorded as the last published attributes, as the setter does
+            attrs = dict(attrs)
+            payload = dumps(attrs)
+            thing._attributes = (attrs, payload)
+            messages.append((thing.topic("attrs"), payload, False, thing))
+        self._publish_messages(messages)
+
+    @contextmanager
+    def batch(self):
+        """Group the messages published in this thread within the block.
+
+        The messages are sent together when the block ends, keeping only the
+        latest for each topic. Nested batches are merged into the outermost
+        one. The messages are sent even if the block raises an exception, as
+        the Things (their publish policies, optimistic states and state store)
+        already consider them published.
+
+            with manager.batch():
+                for thing, value in zip(things, values):
+                    thing.state = value
+
+        A batch is not faster than publishing each message: every message is
+        still handed to the client on its own (paho has no bulk publish), and
+        collecting them has a small cost of its own. Use it to coalesce the
+        repeated updates of a topic, or to send a consistent set of states
+        together; publish_many is the fast path for bulk updates.
+        """
+        if self._batch.messages is not None:
+            yield
+            return
+
+        self._batch.messages = dict()
+        with self._batches_lock:
+            self._batches += 1
+            self._update_publish_path()
+        try:
+            yield
+        finally:
+            pending, self._batch.messages = self._batch.messages, None
+            with self._batches_lock:
+                self._batches -= 1
+                self._update_publish_path()
+            self._publish_messages([(topic, payload, retain, thing)
+                                    for topic, (payload, retain, thing) in pending.items()])
+
+    def on_disconnect(self, _, userdata, rc, properties=None):
+        if self.outbound is not None:
+            self.outbound.go_offline()
+        if self.aliases is not None:
+            self.aliases.reset()
         if rc != 0:
-            logger.info("Unexpected MQTT disconnection (rc=%d).", rc)
+            logger.info("Unexpected MQTT disconnection (rc=%s).", rc)
 
     def on_message(self, _, userdata, msg):
         """React to a MQTT message.
 
-        The derived class should reimplement this.
+        Command messages are dispatched through a single lookup on the routing
+        table (see add_route). Derived classes may reimplement this in order
+        to handle other messages.
         """
-        pass
+        handler = self.routes.get(msg.topic)
+        if handler is None:
+            logger.debug("Ignoring message on unrouted topic: %s", msg.topic)
+            return
+        handler(_, userdata, msg)
 
     @staticmethod
     def _format_mac(mac: str) -> str:
@@ -165,63 +522,336 @@ class MqttManager(Thread):
     def availability_topic(self):
         return f"{ self.base_topic }/availability"
 
+    @property
+    def ha_status_topic(self):
+        return f"{ self.discovery_prefix }/status"
+
     @property
     def subscribe_topic(self):
-        return [
-            (f"{ self.base_topic }/+/set", 0),  # Most things use `set`
-            (f"{ self.base_topic }/+/+/set", 0),  # Some things are nested (at least: fans)
-            (f"{ self.base_topic }/+/press", 0),  # Buttons use `press`
-        ]
+        share = f"$share/{ self.share_group }/" if self.share_group else ""
+        if self.shard_count > 1:
+            # Only the command topics of the Things of this shard
+            topics = [(f"{ share }{ topic }", 0) for topic in self.routes
+                      if topic != self.ha_status_topic]
+        else:
+            topics = [
+                (f"{ share }{ self.base_topic }/+/set", 0),  # Most things use `set`
+                (f"{ share }{ self.base_topic }/+/+/set", 0),  # Nested things (at least: fans)
+                (f"{ share }{ self.base_topic }/+/press", 0),  # Buttons use `press`
+            ]
+        if self.state_cache is not None:
+            topics.append((self.ha_status_topic, 0))  # Home Assistant birth message
+        return topics
+
+    def on_ha_status(self, _, userdata, msg):
+        """React to the birth (and last will) messages of Home Assistant."""
+        if msg.payload != b"online":
+            logger.info("Home Assistant status: %s", msg.payload)
+            return
+        if msg.retain:
+            # Retained status received on (re)connection; nothing was lost
+            return
+
+        delay = random.uniform(0, self.replay_jitter)
+        logger.info("Home Assistant is online, replaying discovery and states in %.1fs", delay)
+        self.call_later(delay, self.replay)
+
+    def replay(self):
+        """Publish the discovery messages and the cached states again.
+
+        Both are sent in chunks, at most `replay_rate` per second.
+        """
+        if self.coordinator:
+            self.publish_discovery(force=True, then=self._replay_states, rate=self.replay_rate)
+        else:
+            self._replay_states()
+
+    def _replay_states(self):
+        messages = [(topic, payload, retain)
+                    for topic, (payload, retain) in list(self.state_cache.items())]
+        self._publish_paced(messages, self.replay_rate,
+                            lambda: logger.info("Replayed %d cached messages", len(messages)))
 
-    def on_connect(self, _, userdata, flags, rc):
-        logger.info("Connected with result code %d", rc)
+    def _publish_paced(self, messages: list[tuple[str, Any, bool]], rate: float,
+                       then: Optional[Callable] = None, start: int = 0,
+                       published: Optional[Callable] = None):
+        """Publish `messages` at `rate` messages per second, then call `then`.
+
+        `published` is called with the topic and payload of each message that
+        the client accepted.
+        """
+        # Chunks of a tenth of a second
+        size = max(1, int(rate / 10))
+        publish = self.client.publish
+        for topic, payload, retain in messages[start:start + size]:
+            info = publish(topic, payload, retain=retain)
+            if published is not None and info.rc == mqtt.MQTT_ERR_SUCCESS:
+                published(topic, payload)
+
+        if start + size < len(messages):
+            self.call_later(size / rate, self._publish_paced, messages, rate, then, start + size,
+                            published)
+        elif then is not None:
+            then()
+
+    def on_connect(self, _, userdata, flags, rc, properties=None):
+        logger.info("Connected with result code %s", rc)
+        if self.aliases is not None:
+            self.aliases.reset(getattr(properties, "TopicAliasMaximum", 0))
+        self.metrics.connects += 1
 
         # Subscribing in on_connect() means that if we lose the connection and
         # reconnect then subscriptions will be renewed.
-        self.client.subscribe(self.subscribe_topic)
+        topics = self.subscribe_topic
+        if topics:  # a shard may have no commands at all
+            self.client.subscribe(topics)
 
-        logger.debug("Device information for this manager: %s", self.device_info)
+        if self.coordinator:
+            self.publish_discovery(then=self._on_discovery_done)
+        else:
+            self._on_discovery_done()
+
+    def _on_discovery_done(self):
+        # Set up availability topic
+        ###########################
+        if self.coordinator:
+            self.client.publish(self.availability_topic, "online", retain=True)
+
+        for thing in self._restored:
+            thing.publish_restored()
+
+        if self.outbound is not None:
+            publish = self.client.publish if self.aliases is None else self.aliases.publish
+            for topic, payload, retain in self.outbound.drain():
+                publish(topic, payload, retain=retain)
+
+    def _common_discovery_config(self, origin: Optional[DeviceInfo]) -> dict:
+        """Return the discovery config shared by all the Things of a device."""
+        if origin is None:
+            return {
+                "~": self.base_topic,
+                "availability_topic": self.availability_topic,
+                "device": self.device_info,
+            }
+        else:
+            return {
+                "~": self.base_topic,
+                "availability_topic": self.availability_topic,
+                "device": origin,
+                "via": self.device_info["identifiers"][0]
+            }
+
+    def _thing_discovery_config(self, thing: Thing) -> dict:
+        """Return the discovery config specific to a certain Thing."""
+        # New dictionary with sensible defaults
+        config = {"unique_id": f"{ self.unique_identifier }_{ thing.short_id }"}
+
+        # Then call get_config, and allow the implementation to override
+        # the previously set defaults (at their own risk)
+        config.update(thing.get_config())
+        return config
+
+    def get_discovery_config(self, origin: Optional[DeviceInfo], thing: Thing) -> tuple[str, dict]:
+        """Return the discovery topic and config for a certain Thing."""
+        config = self._common_discovery_config(origin)
+        config.update(self._thing_discovery_config(thing))
+
+        config_topic = "%s/%s/%s/%s/config" % (
+                self.discovery_prefix,
+                thing.component,
+                self.node_id,
+                thing.short_id
+            )
+        return config_topic, config
+
+    def _device_object_id(self, origin: Optional[DeviceInfo]) -> str:
+        """Return the discovery object id for the device `origin`."""
+        if origin is None:
+            return self.node_id
+
+        if origin.get("identifiers"):
+            device_id = origin["identifiers"][0]
+        elif origin.get("connections"):
+            device_id = "_".join(origin["connections"][0])
+        else:
+            device_id = origin.get("name", "")
+        return "%s/%s" % (self.node_id, re.sub(r"[^a-zA-Z0-9_-]", "_", device_id))
+
+    def get_device_discovery_config(self, origin: Optional[DeviceInfo],
+                                    things: list[Thing]) -> tuple[str, dict]:
+        """Return the device discovery topic and config for a group of Things.
+
+        All the `things` must belong to the same device (`origin`). The config
+        holds the device information and the shared options once, and a
+        component entry for each Thing.
+        """
+        config = self._common_discovery_config(origin)
+        if origin is not None:
+            # Device discovery has no per-entity "via"; link the devices instead
+            del config["via"]
+            config["device"] = dict(origin)
+            config["device"].setdefault("via_device", self.device_info["identifiers"][0])
+
+        config["origin"] = {
+            "name": "hass-mqtt-things",
+            "sw_version": __version__,
+            "support_url": "https://github.com/alexbarcelo/hass-mqtt-things",
+        }
+        config["components"] = {
+            thing.short_id: {"platform": thing.component, **self._thing_discovery_config(thing)}
+            for thing in things
+        }
 
+        config_topic = "%s/device/%s/config" % (
+                self.discovery_prefix,
+                self._device_object_id(origin),
+            )
+        return config_topic, config
+
+    def get_discovery_messages(self) -> Iterator[tuple[str, dict, str]]:
+        """Yield the topic, config and a description of each discovery message.
+
+        Depending on `device_discovery`, there is a message per Thing or a
+        message per device.
+        """
+        if not self.device_discovery:
+            for origin, thing in self.things:
+                config_topic, config = self.get_discovery_config(origin, thing)
+                yield config_topic, config, repr(thing)
+            return
+
+        devices: dict[str, tuple[Optional[DeviceInfo], list[Thing]]] = dict()
         for origin, thing in self.things:
-            if origin is None:
-                common_config = {
-                    "~": self.base_topic,
-                    "availability_topic": self.availability_topic,
-                    "device": self.device_info,
-                }
-            else:
-                common_config = {
-                    "~": self.base_topic,
-                    "availability_topic": self.availability_topic,
-                    "device": origin,
-                    "via": self.device_info["identifiers"][0]
-                }
-
-            logger.info("Publishing discovery message for: %r", thing)
-            
-            # New dictionary with sensible defaults
-            config = common_config.copy()
-            config["unique_id"] = f"{ self.unique_identifier }_{ thing.short_id }"
-
-            # Then call get_config, and allow the implementation to override
-            # the previously set defaults (at their own risk)
-            config.update(thing.get_config())
-
-            config_topic = "%s/%s/%s/%s/config" % (
-                    self.discovery_prefix,
-                    thing.component,
-                    self.node_id,
-                    thing.short_id
-                )
+            object_id = self._device_object_id(origin)
+            if object_id not in devices:
+                devices[object_id] = (origin, [])
+            devices[object_id][1].append(thing)
 
-            logger.debug("Sending the following config dict to %s:\n%s", config_topic, config)
+        for origin, things in devices.values():
+            config_topic, config = self.get_device_discovery_config(origin, things)
+            description = "device %s (%d things)" % (config["device"].get("name"), len(things))
+            yield config_topic, config, description
 
-            self.client.publish(config_topic, json.dumps(config), retain=True)
-            thing.set_callbacks()
+    def publish_discovery(self, force: bool = False, then: Optional[Callable] = None,
+                          rate: Optional[float] = None):
+        """Publish the discovery messages of all the Things.
 
-        # Set up availability topic
-        ###########################
-        self.client.publish(self.availability_topic, "online", retain=True)
+        See get_discovery_messages for the messages that are sent.
+
+        If the manager has a discovery cache, only the messages that changed
+        since they were last published are sent, unless `force` is set. The
+        figures of the last run are kept in `discovery_stats`.
+
+        If the manager has a `discovery_rate` (or `rate` is given, which takes
+        precedence), the messages are sent in the background at that rate.
+        `then` is called once all the messages have been sent.
+        """
+        logger.debug("Device information for this manager: %s", self.device_info)
+
+        start = time.monotonic()
+        messages = list()
+        skipped = 0
+
+        for config_topic, config, description in self.get_discovery_messages():
+            if self.compact_discovery:
+                config = abbreviate(config)
+            payload = dumps(config, compact=self.compact_discovery)
+
+            if (not force and self.discovery_cache is not None
+                    and not self.discovery_cache.changed(config_topic, payload)):
+                skipped += 1
+                continue
+
+            logger.info("Publishing discovery message for: %s", description)
+            logger.debug("Sending the following config dict to %s:\n%s", config_topic, config)
+            messages.append((config_topic, payload, True))
+
+        # The hashes are only recorded for the messages actually published
+        published = self.discovery_cache.record if self.discovery_cache is not None else None
+
+        def done():
+            if self.discovery_cache is not None:
+                self.discovery_cache.save()
+            self.discovery_stats = {
+                "duration": time.monotonic() - start,
+                "published": len(messages),
+                "skipped": skipped,
+            }
+            logger.info("Discovery done in %.3fs: %d published, %d unchanged",
+                        self.discovery_stats["duration"], len(messages), skipped)
+            if then is not None:
+                then()
+
+        if rate is None:
+            rate = self.discovery_rate
+        if rate is not None:
+            self._publish_paced(messages, rate, done, published=published)
+            return
+
+        publish = self.client.publish
+        for config_topic, payload, retain in messages:
+            info = publish(config_topic, payload, retain=retain)
+            if published is not None and info.rc == mqtt.MQTT_ERR_SUCCESS:
+                published(config_topic, payload)
+        done()
+
+    def _queue_depth(self) -> int:
+        # paho does not expose the size of its queues; these are internals of
+        # paho-mqtt 1.x (outgoing packets and in-flight QoS>0 messages)
+        return (len(getattr(self.client, "_out_packet", ()))
+                + len(getattr(self.client, "_out_messages", ())))
+
+    def get_metrics(self) -> dict:
+        """Return the figures of the activity of this manager.
+
+        The rates are computed over the time elapsed since the previous call
+        (or since the manager was created). Callback latencies are in seconds
+        and measure the execution of the callbacks of the Things; see the
+        `dispatcher` entry for the queueing figures when using an executor.
+        """
+        publish_rate, command_rate = self.metrics.rates()
+        latency = self.metrics.callback_latency.stats()
+        metrics = {
+            "uptime": time.monotonic() - self.metrics.started,
+            "published": self.metrics.published,
+            "publish_rate": publish_rate,
+            "commands": self.metrics.commands,
+            "command_rate": command_rate,
+            "callback_latency_avg": latency["avg"],
+            "callback_latency_max": latency["max"],
+            "callback_latency": latency["buckets"],
+            "queue_depth": self._queue_depth(),
+            "connects": self.metrics.connects,
+            "reconnects": max(self.metrics.connects - 1, 0),
+            "discovery_duration": self.discovery_stats.get("duration", 0.0),
+        }
+        if self.dispatcher is not None:
+            metrics["dispatcher"] = self.dispatcher.stats()
+        if self.outbound is not None:
+            metrics["outbound"] = self.outbound.stats()
+        if self.aliases is not None:
+            metrics["topic_aliases"] = self.aliases.stats()
+        if self.limiter.bucket is not None or self.limiter.limits:
+            metrics["rate_limit"] = self.limiter.stats()
+        return metrics
+
+    def add_diagnostics(self, interval: float = 60.0):
+        """Publish the main metrics as diagnostic Sensors of the manager device.
+
+        The sensors are updated every `interval` seconds once the manager is
+        running. Call this before starting the manager.
+        """
+        self.diagnostics_interval = interval
+        for key, name, unit in DIAGNOSTIC_SENSORS:
+            sensor = DiagnosticSensor(key, name, unit)
+            self.add_thing(sensor)
+            self.diagnostics.append(sensor)
+
+    def publish_diagnostics(self):
+        """Update the state of the diagnostic Sensors (see add_diagnostics)."""
+        metrics = self.get_metrics()
+        for sensor in self.diagnostics:
+            sensor.state = metrics[sensor.key]
 
     def _gen_device_info(self) -> DeviceInfo:
         """Generate the device information payload."""
@@ -231,3 +861,24 @@ class MqttManager(Thread):
             "connections": [("mac", self.get_mac())],
             "sw_version": __version__,
         }
+
+
+class MqttManager(BaseMqttManager, Thread):
+    """Manager running the MQTT client loop in its own thread.
+
+    Call start() once all the Things have been added.
+    """
+    def run(self):
+        if self.coordinator:
+            self.client.will_set(self.availability_topic, "offline", retain=True)
+        if self.diagnostics:
+            Thread(target=self._diagnostics_loop, name="ham-diagnostics", daemon=True).start()
+        if self.scheduler.entries:
+            Thread(target=self.scheduler.run_forever, name="ham-scheduler", daemon=True).start()
+        logger.info("Starting MQTT client loop")
+        self.client.loop_forever(retry_first_connection=True)
+
+    def _diagnostics_loop(self):
+        while True:
+            time.sleep(self.diagnostics_interval)
+            self.publish_diagnostics()
@@ -0,0 +1,106 @@
+import logging
+import threading
+from typing import Optional
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+logger = logging.getLogger(__name__)
+
+
+class TopicAliases:
+    """Publish through a MQTT v5 client using topic aliases and message expiry.
+
+    Once a topic has been published `threshold` times, it gets a topic alias
+    (as long as there are aliases left, up to the Topic Alias Maximum of the
+    broker). The next publish establishes the alias by sending both the topic
+    and the alias; from then on, only the 2-byte alias is sent instead of the
+    topic. Aliases are never reassigned: they go to the first topics that turn
+    out to be hot (the state topics of the Things updated regularly).
+
+    Aliases only last for a connection, so reset must be called when the
+    client (re)connects, with the maximum given by the broker.
+
+    Topics with an expiry (see set_expiry) are published with that Message
+    Expiry Interval, so the broker discards them instead of delivering stale
+    values late.
+    """
+    def __init__(self, client: mqtt.Client, threshold: int = 2):
+        self.client = client
+        self.threshold = threshold
+        self.maximum = 0
+
+        self._lock = threading.Lock()
+        self._aliases: dict[str, int] = dict()
+        self._counts: dict[str, int] = dict()
+        self._expiry: dict[str, int] = dict()
+
+        self.aliased = 0
+        self.saved_bytes = 0
+
+    def reset(self, maximum: int = 0):
+        """Forget the aliases of the previous connection."""
+        with self._lock:
+            self.maximum = maximum
+            self._aliases.clear()
+            self._counts.clear()
+        if maximum:
+            logger.debug("Using up to %d topic aliases", maximum)
+
+    def set_expiry(self, topic: str, seconds: Optional[int]):
+        """Set the Message Expiry Interval of the messages published on `topic`."""
+        if seconds:
+            self._expiry[topic] = int(seconds)
+        else:
+            self._expiry.pop(topic, None)
+
+    def publish(self, topic: str, payload=None, retain: bool = False) -> mqtt.MQTTMessageInfo:
+        expiry = self._expiry.get(topic)
+        if not self.maximum:
+            return self.client.publish(topic, payload, retain=retain,
+                                       properties=self._properties(None, expiry))
+
+        # The publish that establishes an alias must reach the client before
+        # any other using that alias, hence the lock around the publish itself
+        with self._lock:
+            alias = self._aliases.get(topic)
+            if alias is not None:
+                self.aliased += 1
+                self.saved_bytes += len(topic.encode("utf-8"))
+                return self.client.publish("", payload, retain=retain,
+                                           properties=self._properties(alias, expiry))
+
+            count = self._counts.get(topic, 0) + 1
+            if count >= self.threshold and len(self._aliases) < self.maximum:
+                alias = self._aliases[topic] = len(self._aliases) + 1
+                self._counts.pop(topic, None)
+            else:
+                self._counts[topic] = count
+            return self.client.publish(topic, payload, retain=retain,
+                                       properties=self._properties(alias, expiry))
+
+    @staticmethod
+    def _properties(alias: Optional[int], expiry: Optional[int]) -> Optional[Properties]:
+        if alias is None and expiry is None:
+            return None
+        properties = Properties(PacketTypes.PUBLISH)
+        if alias is not None:
+            properties.TopicAlias = alias
+        if expiry is not None:
+            properties.MessageExpiryInterval = expiry
+        return properties
+
+    def stats(self) -> dict[str, int]:
+        """Return the aliases in use and the topic bytes they saved.
+
+        `saved_bytes` is the size of the topics that were not sent; each
+        aliased publish carries 3 bytes of properties instead.
+        """
+        with self._lock:
+            return {
+                "maximum": self.maximum,
+                "aliases": len(self._aliases),
+                "aliased": self.aliased,
+                "saved_bytes": self.saved_bytes,
+            }
@@ -1,11 +1,12 @@
 from abc import abstractmethod
 
 from .things import Thing
-from .utils import WrapperCallback
 
 
-class Number(Thing):
-    """Basic class for a Number entity."""
+class _Number(Thing):
+    # Implementation of Number, shared with the slotted CompactNumber
+    __slots__ = ()
+
     min: float
     max: float
     step: float
@@ -36,20 +37,22 @@ class Number(Thing):
         return config
 
     def set_callbacks(self):
-        self.mqtt_manager.client.message_callback_add(
-            f'{ self.mqtt_manager.base_topic }/{ self.short_id }/set',
-            WrapperCallback(self.raw_callback)
-        )
+        self.add_command_callback('set', self.raw_callback,
+                                  debounce=self.debounce, debounce_edge=self.debounce_edge)
 
 
-class OptimisticNumber(Number):
-    """A Number that will track its state optimistically.
+class Number(_Number):
+    """Basic class for a Number entity."""
+
+
+class _OptimisticNumber(_Number):
+    # Implementation of OptimisticNumber, shared with the slotted CompactNumber
+    __slots__ = ()
 
-    "Optimistically" means that when the state is set (from Home Assistant or
-    from the Python application) the number holds that value.
-    """
     _state: float = 1
 
+    persistent_fields = ("_state",)
+
     @property
     def state(self):
         return self._state
@@ -57,6 +60,7 @@ class OptimisticNumber(Number):
     @state.setter
     def state(self, value):
         self._state = value
+        self.persist("_state", value)
         self.publish_state(self._state)
 
     def callback(self, state: float):
@@ -66,3 +70,11 @@ class OptimisticNumber(Number):
         config = super().get_config()
         config["state_topic"] = f'~/{ self.short_id }/main'
         return config
+
+
+class OptimisticNumber(_OptimisticNumber, Number):
+    """A Number that will track its state optimistically.
+
+    "Optimistically" means that when the state is set (from Home Assistant or
+    from the Python application) the number holds that value.
+    """
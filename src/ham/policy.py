@@ -0,0 +1,95 @@
+import time
+from typing import Any, ClassVar, Optional
+
+# Sentinel for "nothing has been published yet"
+_NOTHING = object()
+
+
+class PublishPolicy:
+    """Mixin that decides whether a new state is worth publishing.
+
+    The policy is configured through class attributes (in the same way as the
+    `config_fields` of the Things):
+
+     - `skip_unchanged`: do not publish a state equal to the last published.
+     - `deadband`: do not publish numeric states that differ less than this
+       absolute amount from the last published one.
+     - `deadband_relative`: same as `deadband`, but relative to the last
+       published value (e.g. 0.01 for a 1% deadband).
+     - `min_interval`: minimum amount of seconds between two publishes.
+     - `max_silence`: publish anyway if more than this amount of seconds have
+       passed since the last publish. If not set and the Thing has an
+       `expire_after`, half of `expire_after` is used, so that the entity
+       does not expire while its value is stable.
+
+    If the Thing has `force_update` set, Home Assistant wants every update,
+    so unchanged values (and deadbands) are not suppressed. The minimum
+    interval still applies.
+
+    By default nothing is suppressed.
+    """
+    __slots__ = ()
+
+    skip_unchanged: ClassVar[bool] = False
+    deadband: ClassVar[Optional[float]] = None
+    deadband_relative: ClassVar[Optional[float]] = None
+    min_interval: ClassVar[Optional[float]] = None
+    max_silence: ClassVar[Optional[float]] = None
+
+    _last_published: Any = _NOTHING
+    _last_publish_time: float = 0.0
+
+    def should_publish(self, value: Any) -> bool:
+        """Check the policy for `value` and record it as published if it passes."""
+        if not (self.skip_unchanged or self.min_interval is not None
+                or self.deadband is not None or self.deadband_relative is not None):
+            return True
+
+        now = time.monotonic()
+        last = self._last_published
+        if last is not _NOTHING:
+            elapsed = now - self._last_publish_time
+            heartbeat = self.max_silence
+            if heartbeat is None and getattr(self, "expire_after", None):
+                heartbeat = self.expire_after / 2
+
+            if heartbeat is None or elapsed < heartbeat:
+                if self.min_interval is not None and elapsed < self.min_interval:
+                    return False
+                if (not getattr(self, "force_update", False)
+                        and not self._is_significant(last, value)):
+                    return False
+
+        self._last_published = value
+        self._last_publish_time = now
+        return True
+
+    def _is_significant(self, last: Any, value: Any) -> bool:
+        if self.deadband is None and self.deadband_relative is None:
+            return not self.skip_unchanged or value != last
+
+        if not (_is_number(value) and _is_number(last)):
+            return value != last
+
+        threshold = 0.0
+        if self.deadband is not None:
+            threshold = self.deadband
+        if self.deadband_relative is not None:
+            threshold = max(threshold, abs(last) * self.deadband_relative)
+        return abs(value - last) > threshold
+
+
+class Pollable:
+    """Mixin for the Things whose state can be polled by the manager.
+
+    Subclasses setting `poll_interval` (seconds between the calls to poll,
+    None for no polling) must implement a `poll` method returning the current
+    state, or None to skip the update (see PollScheduler).
+    """
+    __slots__ = ()
+
+    poll_interval: ClassVar[Optional[float]] = None
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
@@ -0,0 +1,256 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# What to do with a message when its bucket is empty
+POLICIES = ("drop", "delay", "coalesce")
+
+# Minimum seconds between two releases of queued messages
+MIN_WAIT = 0.01
+
+
+class TokenBucket:
+    """Allow `rate` messages per second, with bursts of up to `burst` messages."""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("The rate must be positive, got %r" % (rate,))
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> float:
+        """Add the tokens earned since the last refill; return the available tokens."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available (as of the last refill)."""
+        return max(1.0 - self.tokens, 0.0) / self.rate
+
+
+class ThingLimit:
+    """Bucket and counters of one of the Things of a RateLimiter."""
+    __slots__ = ("bucket", "policy", "pending", "passed", "dropped", "delayed", "coalesced")
+
+    def __init__(self, bucket: Optional[TokenBucket], policy: str):
+        self.bucket = bucket
+        self.policy = policy
+        self.pending = 0
+        self.passed = 0
+        self.dropped = 0
+        self.delayed = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "passed": self.passed,
+            "dropped": self.dropped,
+            "delayed": self.delayed,
+            "coalesced": self.coalesced,
+        }
+
+
+# A queued message: (topic, payload, retain, limit, held by the global bucket)
+_Pending = tuple[str, Any, bool, Optional[ThingLimit], bool]
+
+
+class RateLimiter:
+    """Token-bucket rate limiting of the messages published by the Things.
+
+    There is an optional global bucket (`rate` messages per second, bursts of
+    `burst` messages) shared by all the Things, and one bucket for each Thing
+    that has a `rate_limit` (see Thing). A message is sent only if there is a
+    token in both buckets. Otherwise, the policy of the bucket that is empty
+    (`policy` for the global one, `rate_limit_policy` for the Things) decides:
+
+     - "drop": the message is discarded.
+     - "delay": the message is queued, and sent once there are tokens.
+     - "coalesce": as "delay", but only the latest message of each topic is
+       kept in the queue (states are idempotent).
+
+    Queued messages keep their order: while a Thing has messages queued, its
+    new messages are queued behind them, and the same goes for the global
+    bucket. Up to `max_pending` messages are queued; beyond that, the oldest
+    ones are dropped. Queued messages are released by `send` (a callable
+    receiving a list of (topic, payload, retain) messages), from a timer set
+    with `call_later`.
+    """
+    def __init__(self, send: Callable[[list], Any], call_later: Callable,
+                 rate: Optional[float] = None, burst: Optional[float] = None,
+                 policy: str = "delay", max_pending: int = 10000):
+        if policy not in POLICIES:
+            raise ValueError("Unknown rate limit policy %r (expected one of: %s)"
+                             % (policy, ", ".join(POLICIES)))
+        self.send = send
+        self.call_later = call_later
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+        self.policy = policy
+        self.max_pending = max_pending
+
+        self.limits: dict[str, ThingLimit] = dict()
+        self.total = ThingLimit(None, policy)
+
+        self._lock = threading.Lock()
+        self._pending: OrderedDict[Any, _Pending] = OrderedDict()
+        self._global_pending = 0
+        self._sequence = itertools.count()
+        self._scheduled = False
+
+    def add_thing(self, thing):
+        """Create the bucket of `thing`, if it has a `rate_limit`."""
+        rate = getattr(thing, "rate_limit", None)
+        if rate is None:
+            return
+        policy = thing.rate_limit_policy
+        if policy not in POLICIES:
+            raise ValueError("Unknown rate limit policy %r for %s (expected one of: %s)"
+                             % (policy, thing.short_id, ", ".join(POLICIES)))
+        self.limits[thing.short_id] = ThingLimit(
+            TokenBucket(rate, thing.rate_limit_burst), policy)
+
+    def admit(self, topic: str, payload, retain: bool = False, thing=None) -> bool:
+        """Check the buckets for a message.
+
+        Return True if the caller must send the message right away. Otherwise,
+        the message has been queued (to be sent later) or dropped.
+        """
+        limit = self.limits.get(thing.short_id) if thing is not None and self.limits else None
+        if limit is None and self.bucket is None:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            if limit is not None and (limit.pending or limit.bucket.refill(now) < 1):
+                self._throttle(topic, payload, retain, limit, limit.policy, False)
+                return False
+            if self.bucket is not None and (self._global_pending or self.bucket.refill(now) < 1):
+                self._throttle(topic, payload, retain, limit, self.policy, True)
+                return False
+
+            self._take(limit)
+            self.total.passed += 1
+            if limit is not None:
+                limit.passed += 1
+        return True
+
+    def admit_many(self, messages: list[tuple[str, Any, bool, Any]]) -> list[tuple[str, Any, bool]]:
+        """Same as admit, for (topic, payload, retain, thing) messages.
+
+        Return the (topic, payload, retain) messages to be sent right away.
+        """
+        if self.bucket is None and not self.limits:
+            return [(topic, payload, retain) for topic, payload, retain, _ in messages]
+        return [(topic, payload, retain) for topic, payload, retain, thing in messages
+                if self.admit(topic, payload, retain, thing)]
+
+    def _take(self, limit: Optional[ThingLimit]):
+        if limit is not None:
+            limit.bucket.tokens -= 1
+        if self.bucket is not None:
+            self.bucket.tokens -= 1
+
+    def _throttle(self, topic: str, payload, retain: bool,
+                  limit: Optional[ThingLimit], policy: str, held_globally: bool):
+        counters = (self.total, limit) if limit is not None else (self.total,)
+        if policy == "drop":
+            for counter in counters:
+                counter.dropped += 1
+            return
+
+        if policy == "coalesce":
+            key = topic
+            if key in self._pending:
+                self._dequeue(key)
+                for counter in counters:
+                    counter.coalesced += 1
+        else:
+            key = (topic, next(self._sequence))
+        self._pending[key] = (topic, payload, retain, limit, held_globally)
+        self._global_pending += held_globally
+        if limit is not None:
+            limit.pending += 1
+        for counter in counters:
+            counter.delayed += 1
+
+        while len(self._pending) > self.max_pending:
+            _, _, _, dropped_limit, _ = self._dequeue(next(iter(self._pending)))
+            self.total.dropped += 1
+            if dropped_limit is not None:
+                dropped_limit.dropped += 1
+
+        if not self._scheduled:
+            self._schedule(time.monotonic())
+
+    def _dequeue(self, key) -> _Pending:
+        entry = self._pending.pop(key)
+        self._global_pending -= entry[4]
+        if entry[3] is not None:
+            entry[3].pending -= 1
+        return entry
+
+    def _schedule(self, now: float):
+        # Called with the lock held; wake up when the first queued message can go
+        if not self._pending:
+            return
+        global_wait = self._wait_time(self.bucket, now)
+        waits = {global_wait if limit is None
+                 else max(self._wait_time(limit.bucket, now), global_wait)
+                 for _, _, _, limit, _ in self._pending.values()}
+        self._scheduled = True
+        self.call_later(max(min(waits), MIN_WAIT), self._release)
+
+    @staticmethod
+    def _wait_time(bucket: Optional[TokenBucket], now: float) -> float:
+        if bucket is None:
+            return 0.0
+        bucket.refill(now)
+        return bucket.wait_time()
+
+    def _release(self):
+        """Send the queued messages for which there are tokens."""
+        ready = list()
+        with self._lock:
+            self._scheduled = False
+            now = time.monotonic()
+            if self.bucket is not None:
+                self.bucket.refill(now)
+            blocked = set()
+            for key, (topic, payload, retain, limit, _) in list(self._pending.items()):
+                if limit is not None and (limit in blocked or limit.bucket.refill(now) < 1):
+                    # Later messages of the same Thing stay behind this one
+                    blocked.add(limit)
+                    continue
+                if self.bucket is not None and self.bucket.tokens < 1:
+                    break
+                self._dequeue(key)
+                self._take(limit)
+                ready.append((topic, payload, retain))
+            self._schedule(now)
+
+        if ready:
+            self.send(ready)
+
+    def stats(self) -> dict:
+        """Return the counters, overall and for each throttled Thing.
+
+        `passed` counts the messages sent right away, `delayed` the messages
+        queued (a queued message replaced by a newer one for the same topic is
+        also counted as `coalesced`) and `dropped` the messages discarded.
+        """
+        with self._lock:
+            stats: dict[str, Any] = self.total.stats()
+            stats["pending"] = len(self._pending)
+            stats["things"] = {
+                short_id: limit.stats() for short_id, limit in self.limits.items()
+                if limit.dropped or limit.delayed
+            }
+            return stats
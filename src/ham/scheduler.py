@@ -0,0 +1,217 @@
+import asyncio
+import inspect
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PollEntry:
+    """A Thing registered in a PollScheduler."""
+    __slots__ = ("thing", "interval", "ticks", "due_tick", "running",
+                 "polls", "overruns", "failures")
+
+    def __init__(self, thing, interval: float, ticks: int):
+        self.thing = thing
+        self.interval = interval
+        self.ticks = ticks
+        self.due_tick = 0
+        self.running = False
+        self.polls = 0
+        self.overruns = 0
+        self.failures = 0
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) scheduling with a `resolution` in seconds.
+
+    Entries are placed in the slot of the tick in which they are due; entries
+    due more than a full turn of the wheel ahead stay in their slot until
+    their tick arrives.
+    """
+    def __init__(self, resolution: float = 0.1, slots: int = 1024):
+        self.resolution = resolution
+        self.start = time.monotonic()
+        self.tick = 0
+        self._slots: list[list[PollEntry]] = [[] for _ in range(slots)]
+
+    def reset(self, now: float):
+        """Restart the wheel at `now`, with no entries."""
+        self.start = now
+        self.tick = 0
+        self._slots = [[] for _ in range(len(self._slots))]
+
+    def schedule(self, entry: PollEntry, due_tick: int):
+        if due_tick <= self.tick:
+            # Overdue (e.g. after a stall): skip the missed polls, keeping the
+            # phase of the entry so that the entries stay spread over the wheel
+            due_tick += math.ceil((self.tick + 1 - due_tick) / entry.ticks) * entry.ticks
+        entry.due_tick = due_tick
+        self._slots[entry.due_tick % len(self._slots)].append(entry)
+
+    def advance(self, now: float) -> list[PollEntry]:
+        """Move the wheel up to `now` and return the entries that are due."""
+        target = int((now - self.start) / self.resolution)
+        due = list()
+        while self.tick < target:
+            self.tick += 1
+            index = self.tick % len(self._slots)
+            slot = self._slots[index]
+            if not slot:
+                continue
+            self._slots[index] = [entry for entry in slot if entry.due_tick > self.tick]
+            due.extend(entry for entry in slot if entry.due_tick <= self.tick)
+        return due
+
+    def delay(self, now: float) -> float:
+        """Seconds until the next tick."""
+        return max(self.start + (self.tick + 1) * self.resolution - now, 0.0)
+
+
+class PollScheduler:
+    """Run the `poll` method of many Things at their `poll_interval`.
+
+    All the Things share a single timer wheel, run either by a thread
+    (run_forever) or by an asyncio task (run_async). The first poll of each
+    Thing happens at a random point of its first interval, so that Things with
+    the same interval do not all poll at the same time.
+
+    The value returned by `poll` is set as the `state` of the Thing (unless it
+    is None). If an `executor` is given, polls are run there, so blocking
+    reads do not delay the other polls; when a poll is still running when the
+    next one is due, the next one is skipped and counted as an overrun. Without
+    executor, a poll taking longer than its interval is also an overrun.
+
+    Polls can be coroutines (`async def poll`) only if the scheduler is run by
+    run_async, without executor; set `asynchronous` to accept them.
+    """
+    def __init__(self, executor: Optional[Executor] = None, resolution: float = 0.1,
+                 asynchronous: bool = False):
+        self.executor = executor
+        self.asynchronous = asynchronous
+        self.wheel = TimerWheel(resolution)
+        self.entries: list[PollEntry] = list()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def add(self, thing, interval: Optional[float] = None):
+        """Poll `thing` every `interval` seconds (by default, its poll_interval)."""
+        poll = getattr(thing, "poll", None)
+        if not callable(poll):
+            raise TypeError("%r has no poll method" % (thing,))
+        if inspect.iscoroutinefunction(poll) and (not self.asynchronous
+                                                  or self.executor is not None):
+            raise TypeError("%r has a coroutine poll, which needs an asyncio manager "
+                            "without poll_executor" % (thing,))
+        interval = interval if interval is not None else thing.poll_interval
+        ticks = max(1, math.ceil(interval / self.wheel.resolution))
+        entry = PollEntry(thing, interval, ticks)
+        with self._lock:
+            self.entries.append(entry)
+            self.wheel.schedule(entry, self.wheel.tick + random.randint(1, ticks))
+
+    def restart(self, now: Optional[float] = None):
+        """Restart the clock of the wheel and spread the first polls again.
+
+        This is called when the scheduler starts running, so that the first
+        polls are spread over their first interval from then on (and not from
+        when the Things were added).
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self.wheel.reset(now)
+            for entry in self.entries:
+                self.wheel.schedule(entry, random.randint(1, entry.ticks))
+
+    def tick(self, now: Optional[float] = None) -> float:
+        """Run the polls that are due; return the seconds until the next tick."""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            due = self.wheel.advance(now)
+            for entry in due:
+                # Fixed rate: the next poll is relative to when this one was due
+                self.wheel.schedule(entry, entry.due_tick + entry.ticks)
+
+        for entry in due:
+            self._run(entry)
+        return self.wheel.delay(time.monotonic())
+
+    def _run(self, entry: PollEntry):
+        if entry.running:
+            entry.overruns += 1
+            logger.debug("Skipping poll of %r, the previous one is still running", entry.thing)
+            return
+
+        entry.polls += 1
+        if self.executor is not None:
+            entry.running = True
+            future = self.executor.submit(self._poll, entry)
+            future.add_done_callback(lambda _: self._done(entry))
+            return
+
+        start = time.monotonic()
+        self._poll(entry)
+        if time.monotonic() - start > entry.interval:
+            entry.overruns += 1
+            logger.warning("Poll of %r took longer than its interval", entry.thing)
+
+    @staticmethod
+    def _done(entry: PollEntry):
+        entry.running = False
+
+    def _poll(self, entry: PollEntry):
+        try:
+            value = entry.thing.poll()
+            if inspect.isawaitable(value):
+                entry.running = True
+                task = asyncio.ensure_future(self._await(entry, value))
+                task.add_done_callback(lambda _: self._done(entry))
+                return
+            self._set(entry, value)
+        except Exception:
+            entry.failures += 1
+            logger.exception("Poll of %r failed", entry.thing)
+
+    async def _await(self, entry: PollEntry, awaitable):
+        try:
+            self._set(entry, await awaitable)
+        except Exception:
+            entry.failures += 1
+            logger.exception("Poll of %r failed", entry.thing)
+
+    @staticmethod
+    def _set(entry: PollEntry, value: Any):
+        if value is not None:
+            entry.thing.state = value
+
+    def run_forever(self):
+        """Run the scheduler in the current thread until stop() is called."""
+        self._stopped.clear()
+        self.restart()
+        while not self._stopped.wait(self.tick()):
+            pass
+
+    async def run_async(self):
+        """Run the scheduler in the running event loop (polls may be coroutines)."""
+        self.restart()
+        while True:
+            await asyncio.sleep(self.tick())
+
+    def stop(self):
+        self._stopped.set()
+
+    def stats(self) -> dict[str, int]:
+        """Return the amount of Things and the poll counters."""
+        with self._lock:
+            entries = list(self.entries)
+        return {
+            "things": len(entries),
+            "polls": sum(entry.polls for entry in entries),
+            "overruns": sum(entry.overruns for entry in entries),
+            "failures": sum(entry.failures for entry in entries),
+        }
@@ -1,20 +1,16 @@
 import logging
 from typing import Union
 
+from .policy import Pollable, PublishPolicy
 from .things import Thing
 
 logger = logging.getLogger(__name__)
 
 
-class Sensor(Thing):
-    """Basic class for a Sensor entity.
-    
-    Sensor are things that only publish their state (they have no callback).
+class _Sensor(PublishPolicy, Pollable, Thing):
+    # Implementation of Sensor, shared with the slotted CompactSensor
+    __slots__ = ()
 
-    This is implemented in this library through a write-only property, called
-    `state`. Other Sensor subclasses may reimplement them; the responsible of
-    publishing stuff is the Thing.publish_state method.
-    """
     device_class: str
     enabled_by_default: bool
     encoding: str
@@ -41,9 +37,24 @@ class Sensor(Thing):
 
     @state.setter
     def state(self, value: Union[bool, bytes, str, int, float]):
-        self.publish_state(value)
+        if self.should_publish(value):
+            self.publish_state(value)
 
     def get_config(self):
         config = super().get_config()
         config["state_topic"] = f'~/{ self.short_id }/main'
         return config
+
+
+class Sensor(_Sensor):
+    """Basic class for a Sensor entity.
+    
+    Sensor are things that only publish their state (they have no callback).
+
+    This is implemented in this library through a write-only property, called
+    `state`. Other Sensor subclasses may reimplement them; the responsible of
+    publishing stuff is the Thing.publish_state method.
+
+    Setting the state goes through the PublishPolicy of the class, which can
+    be used to avoid publishing redundant values (see PublishPolicy).
+    """
@@ -0,0 +1,133 @@
+import logging
+from typing import Optional, Sequence
+
+from .compact import CompactSensor
+from .sensor import Sensor
+from .serialization import encode_state
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class SensorChannel(CompactSensor):
+    """One of the Sensors of a SensorArray."""
+    __slots__ = ("array", "index")
+
+    def __init__(self, array: "SensorArray", index: int):
+        super().__init__("%s_%d" % (array.short_id, index), "%s %d" % (array.name, index))
+        self.array = array
+        self.index = index
+
+    def get_config(self):
+        config = super().get_config()
+        config.update(self.array.config)
+        return config
+
+
+class SensorArray:
+    """A group of Sensors updated at once from a vector of readings.
+
+    The array creates `size` Sensors (see `channels`), which must be added to
+    the manager:
+
+        array = SensorArray("adc", 128, name="ADC", unit_of_measurement="V")
+        manager.add_things(array.channels)
+        ...
+        array.update(readings)
+
+    Each update compares the readings with the last published ones, and only
+    the channels that changed (by more than `deadband`, if set) are published.
+    The readings can be any sequence (e.g. an array.array); with a NumPy array
+    the comparison and rounding (`float_precision`) are vectorized.
+
+    The remaining keyword arguments are the config_fields of the Sensors
+    (device_class, unit_of_measurement...), shared by all the channels.
+    """
+    channels: list[SensorChannel]
+
+    def __init__(self, short_id: str, size: int, name: Optional[str] = None, *,
+                 deadband: Optional[float] = None, float_precision: Optional[int] = None,
+                 **config):
+        unknown = set(config).difference(Sensor.config_fields)
+        if unknown:
+            raise ValueError("Unknown Sensor fields: %s" % ", ".join(sorted(unknown)))
+
+        self.short_id = short_id
+        self.name = name if name is not None else short_id
+        self.size = size
+        self.deadband = deadband
+        self.float_precision = float_precision
+        self.config = config
+
+        self.channels = [SensorChannel(self, index) for index in range(size)]
+        self._topics: Optional[list[str]] = None
+        self._last = None
+
+    @property
+    def topics(self) -> list[str]:
+        """State topics of the channels (available once added to a manager)."""
+        if self._topics is None:
+            self._topics = [channel.topic("main") for channel in self.channels]
+        return self._topics
+
+    def update(self, values: Sequence) -> int:
+        """Publish the channels that changed; return how many were published."""
+        if len(values) != self.size:
+            raise ValueError("Expected %d values, got %d" % (self.size, len(values)))
+
+        if np is not None and isinstance(values, np.ndarray):
+            changed, new_values = self._changed_vectorized(values)
+        else:
+            changed, new_values = self._changed(values)
+
+        if not changed:
+            return 0
+
+        manager = self.channels[0].mqtt_manager
+        topics = self.topics
+        channels = self.channels
+        for index, value in zip(changed, new_values):
+            manager.publish(topics[index], encode_state(value), thing=channels[index])
+        return len(changed)
+
+    def _changed_vectorized(self, values) -> tuple[list[int], list]:
+        last = self._last
+        if last is None or not isinstance(last, np.ndarray):
+            mask = np.ones(self.size, dtype=bool)
+            self._last = np.array(values, dtype=float)
+        else:
+            if self.deadband is None:
+                mask = values != last
+            else:
+                mask = np.abs(values - last) > self.deadband
+            last[mask] = values[mask]
+
+        changed = np.flatnonzero(mask)
+        new_values = values[changed]
+        if self.float_precision is not None and new_values.dtype.kind == "f":
+            new_values = np.round(new_values, self.float_precision)
+        return changed.tolist(), new_values.tolist()
+
+    def _changed(self, values) -> tuple[list[int], list]:
+        last = self._last
+        if last is None or not isinstance(last, list):
+            last = self._last = list(values)
+            changed = list(range(self.size))
+        elif self.deadband is None:
+            changed = [i for i, (v, w) in enumerate(zip(values, last)) if v != w]
+        else:
+            deadband = self.deadband
+            changed = [i for i, (v, w) in enumerate(zip(values, last)) if abs(v - w) > deadband]
+
+        new_values = list()
+        precision = self.float_precision
+        for i in changed:
+            value = last[i] = values[i]
+            if precision is not None and isinstance(value, float):
+                value = round(value, precision)
+            new_values.append(value)
+        return changed, new_values
@@ -0,0 +1,135 @@
+import json
+from typing import Any, Callable, Optional, Union
+
+StateType = Union[bool, bytes, str, int, float]
+
+
+def _encode_bytes(state: bytes) -> bytes:
+    return state
+
+
+def _encode_str(state: str) -> bytes:
+    return state.encode("utf-8")
+
+
+def _encode_int(state: int) -> bytes:
+    return b'%d' % state
+
+
+def _encode_float(state: float) -> bytes:
+    return repr(state).encode("ascii")
+
+
+# Lookup by exact type; subclasses (e.g. enums) go through the generic path.
+# Booleans are handled before the lookup, as they are the most frequent state.
+_STATE_ENCODERS: dict[type, Callable[..., bytes]] = {
+    bytes: _encode_bytes,
+    str: _encode_str,
+    int: _encode_int,
+    float: _encode_float,
+}
+
+
+def encode_state(state: StateType, float_precision: Optional[int] = None) -> bytes:
+    """Encode a state value into the payload expected by Home Assistant.
+
+    Booleans are encoded as ON/OFF, bytes are passed through and everything
+    else is converted to its string representation. If `float_precision` is
+    set, floats are rounded to that amount of decimal digits (which also
+    results in smaller payloads).
+    """
+    if state is True:
+        return b'ON'
+    if state is False:
+        return b'OFF'
+
+    kind = type(state)
+    if float_precision is not None and kind is float:
+        return repr(round(state, float_precision)).encode("ascii")
+
+    encoder = _STATE_ENCODERS.get(kind)
+    if encoder is None:
+        return str(state).encode("utf-8")
+    return encoder(state)
+
+
+# JSON backends: name -> (dumps, compact dumps, loads); dumps return bytes
+def _stdlib_backend():
+    return (
+        lambda obj: json.dumps(obj).encode("utf-8"),
+        lambda obj: json.dumps(obj, separators=(",", ":")).encode("utf-8"),
+        json.loads,
+    )
+
+
+def _orjson_backend():
+    import orjson
+
+    # orjson rejects non-str keys unless told otherwise; the other backends
+    # convert them to strings (e.g. the attributes of a Thing may use ints)
+    def dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    return dumps, dumps, orjson.loads
+
+
+def _ujson_backend():
+    import ujson
+    # ujson escapes forward slashes by default, which is not needed for MQTT
+    return (
+        lambda obj: ujson.dumps(obj, escape_forward_slashes=False).encode("utf-8"),
+        lambda obj: ujson.dumps(obj, escape_forward_slashes=False).encode("utf-8"),
+        ujson.loads,
+    )
+
+
+_JSON_BACKENDS: dict[str, Callable[[], tuple]] = {
+    "orjson": _orjson_backend,
+    "ujson": _ujson_backend,
+    "json": _stdlib_backend,
+}
+
+# Selected by set_json_backend (see the end of the module)
+json_backend = "json"
+_dumps, _dumps_compact, _loads = _stdlib_backend()
+
+
+def set_json_backend(name: Optional[str] = None):
+    """Select the JSON library used for discovery, attributes and commands.
+
+    `name` is one of "orjson", "ujson" or "json" (the standard library). If
+    not set, the fastest one installed is used (which is the default).
+    """
+    global json_backend, _dumps, _dumps_compact, _loads
+
+    if name is not None and name not in _JSON_BACKENDS:
+        raise ValueError("Unknown JSON backend: %s" % name)
+
+    for candidate in ([name] if name is not None else list(_JSON_BACKENDS)):
+        try:
+            _dumps, _dumps_compact, _loads = _JSON_BACKENDS[candidate]()
+        except ImportError:
+            if name is not None:
+                raise
+            continue
+        json_backend = candidate
+        return
+
+
+def dumps(obj: Any, compact: bool = False) -> bytes:
+    """Serialize `obj` to JSON, as bytes ready to be published.
+
+    With `compact`, no whitespace is used. Some backends (orjson, ujson)
+    never use whitespace.
+    """
+    if compact:
+        return _dumps_compact(obj)
+    return _dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse a JSON payload."""
+    return _loads(data)
+
+
+set_json_backend()
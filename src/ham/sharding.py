@@ -0,0 +1,26 @@
+"""Split the Things of one logical node across several managers.
+
+Each process (or container replica) runs a manager with the same node_id
+and the same Things, and a different `shard_index` out of `shard_count`:
+
+    manager = MqttManager(node_id="bridge", shard_index=i, shard_count=4)
+    manager.add_things(all_things)
+    for thing in manager.owned_things:
+        ...  # only drive (poll, update) the Things of this shard
+
+Every manager knows all the Things, but only sets up the callbacks, polls and
+rate limits of the Things of its shard (see shard_of), and subscribes to their
+exact command topics, so the broker delivers each command to the only process
+handling that Thing. The coordinator (by default, shard 0) alone publishes
+the discovery messages and the availability of the node.
+"""
+
+import zlib
+
+
+def shard_of(short_id: str, shard_count: int) -> int:
+    """Return the shard of the Thing with `short_id`.
+
+    The hash is stable across processes and Python versions (unlike hash()).
+    """
+    return zlib.crc32(short_id.encode("utf-8")) % shard_count
@@ -0,0 +1,158 @@
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Union
+
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Persistence of the state of the optimistic Things across restarts.
+
+    The manager restores the `persistent_fields` of each Thing from `load`
+    when the Thing is added, and the Things record their changes with `put`
+    (see Thing.persist). Subclasses implement the storage; this base class
+    keeps the values in memory only.
+    """
+    def __init__(self):
+        self.values: dict[str, dict[str, Any]] = dict()
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        """Return the stored values, indexed by short_id and field."""
+        return self.values
+
+    def put(self, short_id: str, field: str, value: Any):
+        """Record a new value; this is called on every state change."""
+        self.values.setdefault(short_id, dict())[field] = value
+
+    def flush(self):
+        """Make the recorded values durable."""
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class LogStateStore(StateStore):
+    """StateStore backed by an append-only log of JSON lines.
+
+    `put` only keeps the value in memory; a background thread appends the
+    values changed since the previous write to the log every `flush_interval`
+    seconds, with a single fsync for all of them. This makes the cost of a
+    state change negligible, at the price of losing the changes of the last
+    `flush_interval` seconds on a crash (the pending ones are written on a
+    normal exit).
+
+    When the log holds more than `compact_ratio` times as many records as
+    there are values, it is compacted: rewritten with only the current
+    values. A truncated last line (e.g. after a power loss) is ignored.
+    """
+    def __init__(self, path: Union[str, os.PathLike], flush_interval: float = 1.0,
+                 compact_ratio: int = 4):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_ratio = compact_ratio
+
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: dict[tuple[str, str], Any] = dict()
+        self._records = 0
+        self._corrupted = False
+        self._read()
+        self._file = open(path, "ab")
+        # A corrupted (truncated) record would also spoil the next one appended
+        if self._corrupted or self._records > self.compact_ratio * max(self._count(), 1):
+            self.compact()
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="ham-state-store",
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        short_id, field, value = loads(line)
+                    except (ValueError, TypeError):
+                        logger.warning("Ignoring corrupted record in state store %s", self.path)
+                        self._corrupted = True
+                        continue
+                    self.values.setdefault(short_id, dict())[field] = value
+                    self._records += 1
+        except FileNotFoundError:
+            logger.info("State store %s not found, starting from scratch", self.path)
+
+    def _count(self) -> int:
+        return sum(len(fields) for fields in self.values.values())
+
+    def put(self, short_id: str, field: str, value: Any):
+        # Hot path: the writer only holds this lock to swap the pending dict,
+        # never while writing to the disk
+        with self._pending_lock:
+            self._pending[(short_id, field)] = value
+
+    def flush(self):
+        with self._lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, dict()
+            if not pending or self._file.closed:
+                return
+
+            lines = list()
+            for (short_id, field), value in pending.items():
+                self.values.setdefault(short_id, dict())[field] = value
+                lines.append(dumps([short_id, field, value]) + b"\n")
+            try:
+                self._file.write(b"".join(lines))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                logger.warning("Could not write to the state store %s", self.path, exc_info=True)
+                return
+            self._records += len(lines)
+
+            if self._records > self.compact_ratio * self._count():
+                self._compact()
+
+    def compact(self):
+        """Rewrite the log with only the current values."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = "%s.tmp" % (self.path,)
+        records = [dumps([short_id, field, value]) + b"\n"
+                   for short_id, fields in self.values.items()
+                   for field, value in fields.items()]
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning("Could not compact the state store %s", self.path, exc_info=True)
+            return
+
+        self._file.close()
+        self._file = open(self.path, "ab")
+        self._records = len(records)
+        logger.debug("Compacted state store %s to %d records", self.path, len(records))
+
+    def _flush_loop(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Write the pending values and close the log."""
+        self._stopped.set()
+        self.flush()
+        with self._lock:
+            self._file.close()
@@ -1,11 +1,11 @@
 from abc import abstractmethod
 
 from .things import Thing
-from .utils import WrapperCallback
 
 
-class Switch(Thing):
-    """Basic class for a Switch entity."""
+class _Switch(Thing):
+    # Implementation of Switch, shared with the slotted CompactSwitch
+    __slots__ = ()
 
     optimistic: bool
 
@@ -37,18 +37,19 @@ class Switch(Thing):
         return config
 
     def set_callbacks(self):
-        self.mqtt_manager.client.message_callback_add(
-            f'{ self.mqtt_manager.base_topic }/{ self.short_id }/set',
-            WrapperCallback(self.raw_callback)
-        )
+        self.add_command_callback('set', self.raw_callback)
 
 
-class OptimisticSwitch(Switch):
-    """A Switch that will track its state optimistically.
+class Switch(_Switch):
+    """Basic class for a Switch entity."""
+
+
+class _OptimisticSwitch(_Switch):
+    # Implementation of OptimisticSwitch, shared with the slotted CompactSwitch
+    __slots__ = ()
+
+    persistent_fields = ("_state",)
 
-    "Optimistically" means that when the state is set (from Home Assistant or
-    from the Python application) the switch becomes to that state.
-    """
     @property
     def state(self):
         return self._state
@@ -56,6 +57,7 @@ class OptimisticSwitch(Switch):
     @state.setter
     def state(self, value: bool):
         self._state = value
+        self.persist("_state", value)
         self.publish_state(self._state)
 
     def callback(self, state: bool):
@@ -67,6 +69,14 @@ class OptimisticSwitch(Switch):
         return config
 
 
+class OptimisticSwitch(_OptimisticSwitch, Switch):
+    """A Switch that will track its state optimistically.
+
+    "Optimistically" means that when the state is set (from Home Assistant or
+    from the Python application) the switch becomes to that state.
+    """
+
+
 class ExplicitSwitch(Switch):
     """Track the state of the switch through explicit operations.
 
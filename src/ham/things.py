@@ -1,6 +1,5 @@
 from abc import ABCMeta, abstractmethod
-import json
-from typing import Union, TYPE_CHECKING, ClassVar
+from typing import Optional, Union, TYPE_CHECKING, ClassVar
 
 # LiteralString is from Python 3.11;
 # atm, we want to support Python 3.9
@@ -9,17 +8,54 @@ try:
 except ImportError:
     LiteralString = str
 
+from .dispatch import Debouncer
+from .serialization import dumps, encode_state
+from .utils import WrapperCallback
+
 if TYPE_CHECKING:
     from ham.manager import MqttManager
 
 
 class Thing(metaclass=ABCMeta):
+    # Only the Compact* classes are fully slotted (see ham.compact); the
+    # other Things, and their subclasses, have a __dict__ as usual
+    __slots__ = ()
+
     name: str
     short_id: str
     mqtt_manager: "MqttManager"
 
     config_fields: ClassVar[list[LiteralString]] = []
 
+    # Amount of decimal digits used when publishing float states (None for all)
+    float_precision: ClassVar[Optional[int]] = None
+
+    # If set, setting the same attributes again does not publish them
+    skip_unchanged_attributes: ClassVar[bool] = False
+
+    # Maximum messages per second published by this Thing (None for no limit),
+    # the size of the bursts allowed and what to do with the messages beyond
+    # the limit: "drop", "delay" or "coalesce" (see ham.ratelimit.RateLimiter)
+    rate_limit: ClassVar[Optional[float]] = None
+    rate_limit_burst: ClassVar[Optional[float]] = None
+    rate_limit_policy: ClassVar[str] = "coalesce"
+
+    # Coalescing window (in seconds) for bursts of commands, e.g. when a
+    # slider is dragged, and its edge (see ham.dispatch.Debouncer); used by
+    # the Things that pass them to add_command_callback
+    debounce: ClassVar[Optional[float]] = None
+    debounce_edge: ClassVar[str] = "trailing"
+
+    # Instance attributes saved in the state store of the manager, if any, and
+    # restored when the Thing is added to the manager (see ham.statestore)
+    persistent_fields: ClassVar[tuple[str, ...]] = ()
+
+    # Topics of this Thing, indexed by substate; populated by set_manager
+    _topics: dict[str, str]
+
+    # Last published attributes and their payload (see update_attributes)
+    _attributes: Optional[tuple[dict, bytes]] = None
+
     @property
     @abstractmethod
     def component(self):
@@ -27,6 +63,18 @@ class Thing(metaclass=ABCMeta):
 
     def set_manager(self, mqtt_manager: "MqttManager"):
         self.mqtt_manager = mqtt_manager
+        self._topics = dict()
+        for substate in ("main", "attrs"):
+            self.topic(substate)
+
+    def topic(self, substate: str) -> str:
+        """Return the full MQTT topic for a certain substate of this Thing."""
+        try:
+            return self._topics[substate]
+        except KeyError:
+            topic = f'{ self.mqtt_manager.base_topic }/{ self.short_id }/{ substate }'
+            self._topics[substate] = topic
+            return topic
 
     def get_config(self) -> dict[str, Union[int, float, str]]:
         ret = dict()
@@ -42,32 +90,69 @@ class Thing(metaclass=ABCMeta):
     def set_callbacks(self):
         """Establish the callbacks for this Thing.
 
-        This method typically involves several calls to Client.message_callback_add.
+        This is called once, when the Thing is added to the manager. It
+        typically involves one call to add_command_callback for each command
+        topic of the Thing.
         """
         pass
 
-    def publish_mqtt_message(self, payload: bytes, substate: str):
-        self.mqtt_manager.client.publish(
-            f'{ self.mqtt_manager.base_topic }/{ self.short_id }/{ substate }',
-            payload
+    def add_command_callback(self, substate: str, callback,
+                             debounce: Optional[float] = None, debounce_edge: str = "trailing"):
+        """Route the messages received on the `substate` topic to `callback`.
+
+        The callback is called with the topic and the raw payload. It will be
+        run through the MqttManager dispatch, so it may be executed outside the
+        MQTT network thread (see the `executor` parameter of the manager).
+
+        If `debounce` is set, bursts of messages are coalesced within windows
+        of that amount of seconds (see ham.dispatch.Debouncer).
+        """
+        if debounce is not None:
+            callback = Debouncer(callback, debounce, self.mqtt_manager, self.short_id,
+                                 debounce_edge)
+        self.mqtt_manager.add_route(
+            self.topic(substate),
+            WrapperCallback(callback, self.mqtt_manager.dispatch, self.short_id)
         )
 
+    def publish_mqtt_message(self, payload: bytes, substate: str):
+        try:
+            topic = self._topics[substate]
+        except KeyError:
+            topic = self.topic(substate)
+        self.mqtt_manager.publish(topic, payload, thing=self)
+
+    def persist(self, field: str, value):
+        """Record the new `value` of one of the `persistent_fields`."""
+        store = self.mqtt_manager.state_store
+        if store is not None:
+            store.put(self.short_id, field, value)
+
+    def restore(self, values: dict):
+        """Set the `persistent_fields` found in `values` (from a state store)."""
+        for field in self.persistent_fields:
+            if field in values:
+                setattr(self, field, values[field])
+
+    def publish_restored(self):
+        """Publish the restored state, so Home Assistant does not miss it."""
+        self.publish_state(self._state)
+
     def publish_state(self, state: Union[bool, bytes, str, int, float]):
         """Set the state of this entity.
 
         If use_state_topic attribute is True, then calling this method will
         publish the state of the switch.
         """
-        if state is True:
-            payload = b'ON'
-        elif state is False:
-            payload = b'OFF'
-        elif isinstance(state, bytes):
-            payload = state
+        # Hot path: when the manager has nothing to do but counting the message
+        # (see MqttManager.publish), this goes straight to the client
+        manager = self.mqtt_manager
+        payload = encode_state(state, self.float_precision)
+        if manager._plain_publish:
+            manager.metrics.published += 1
+            manager.client.publish(self._topics["main"], payload)
         else:
-            payload = bytes(str(state), "UTF-8")
-
-        self.publish_mqtt_message(payload, "main")
+            manager.publish(self._topics["main"], payload, thing=self)
 
     @property
     def attributes(self):
@@ -75,8 +160,37 @@ class Thing(metaclass=ABCMeta):
 
     @attributes.setter
     def attributes(self, attributes: dict):
-        """Publish the JSON attributes of this entity."""
-        self.publish_mqtt_message(bytes(json.dumps(attributes), "utf-8"), "attrs")
+        """Publish the JSON attributes of this entity.
+
+        If `skip_unchanged_attributes` is set, nothing is published when the
+        attributes are equal to the last published ones. Otherwise, they are
+        published again without serializing them anew.
+        """
+        last = getattr(self, "_attributes", None)
+        if last is not None and last[0] == attributes:
+            if not self.skip_unchanged_attributes:
+                self.publish_mqtt_message(last[1], "attrs")
+            return
+        self._publish_attributes(dict(attributes))
+
+    def update_attributes(self, **changes):
+        """Merge `changes` into the last published attributes and publish them.
+
+        Nothing is published if all the changes are equal to the current
+        values. Note that the values are compared, not copied: mutating a
+        (nested) value in place and updating it again is not detected.
+        """
+        last = getattr(self, "_attributes", None)
+        attributes = dict(last[0]) if last is not None else dict()
+        if all(key in attributes and attributes[key] == value for key, value in changes.items()):
+            return
+        attributes.update(changes)
+        self._publish_attributes(attributes)
+
+    def _publish_attributes(self, attributes: dict):
+        payload = dumps(attributes)
+        self._attributes = (attributes, payload)
+        self.publish_mqtt_message(payload, "attrs")
 
     def __repr__(self) -> str:
         return f"<{ self.__class__.__name__ } thing name={ self.name }, id={ self.short_id }>"
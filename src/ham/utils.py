@@ -1,7 +1,13 @@
 
 class WrapperCallback:
-    def __init__(self, callback) -> None:
+    __slots__ = ("cb", "dispatch", "key")
+
+    def __init__(self, callback, dispatch=None, key=None) -> None:
         self.cb = callback
+        self.dispatch = dispatch
+        self.key = key
 
     def __call__(self, client, userdata, message):
-        return self.cb(message.topic, message.payload)
+        if self.dispatch is None:
+            return self.cb(message.topic, message.payload)
+        return self.dispatch(self.key, self.cb, message.topic, message.payload)
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ham.async_manager import AsyncMqttManager
+from ham.fake import FakeBroker, FakeClient
+from ham.switch import OptimisticSwitch
+
+
+class AsyncSwitch(OptimisticSwitch):
+    name = "Switch"
+    short_id = "switch"
+
+    def __init__(self):
+        self.commands = list()
+
+    async def callback(self, state: bool):
+        await asyncio.sleep(0)
+        self.commands.append(state)
+        self.state = state
+
+
+async def _command(executor):
+    broker = FakeBroker()
+    manager = AsyncMqttManager(client=FakeClient(broker), node_id="node",
+                               unique_identifier="uid", executor=executor)
+    switch = AsyncSwitch()
+    manager.add_thing(switch)
+
+    task = asyncio.create_task(manager.run())
+    await asyncio.sleep(0.01)
+
+    states = list()
+    home_assistant = FakeClient(broker)
+    home_assistant.on_message = lambda client, userdata, msg: states.append(msg.payload)
+    home_assistant.connect()
+    home_assistant.subscribe("node/switch/main")
+    home_assistant.publish("node/switch/set", "ON")
+    for _ in range(100):
+        if switch.commands:
+            break
+        await asyncio.sleep(0.01)
+
+    await manager.stop()
+    await task
+    return switch, states
+
+
+@pytest.mark.parametrize("executor", [None, ThreadPoolExecutor(2)], ids=["inline", "executor"])
+def test_async_callback(executor):
+    switch, states = asyncio.run(_command(executor))
+
+    assert switch.commands == [True]
+    assert states == [b"ON"]
@@ -0,0 +1,206 @@
+import pytest
+
+from ham import MqttManager, __version__
+from ham.abbreviations import ABBREVIATIONS, abbreviate
+from ham.binary_sensor import BinarySensor
+from ham.button import Button
+from ham.fake import FakeBroker, FakeClient
+from ham.fan import PercentageOptimisticFan
+from ham.light import DimmableLight
+from ham.number import OptimisticNumber
+from ham.sensor import Sensor
+from ham.switch import OptimisticSwitch
+
+
+class Temperature(Sensor):
+    name = "Temperature"
+    short_id = "temp"
+    device_class = "temperature"
+    state_class = "measurement"
+    unit_of_measurement = "°C"
+
+
+class Door(BinarySensor):
+    name = "Door"
+    short_id = "door"
+    device_class = "door"
+
+
+class Plug(OptimisticSwitch):
+    name = "Plug"
+    short_id = "plug"
+
+
+class Level(OptimisticNumber):
+    name = "Level"
+    short_id = "level"
+    min = 0
+    max = 10
+    step = 1
+
+
+class Fan(PercentageOptimisticFan):
+    name = "Fan"
+    short_id = "fan"
+
+
+class Lamp(DimmableLight):
+    name = "Lamp"
+    short_id = "lamp"
+
+    def callback(self, *, state, brightness=None):
+        pass
+
+
+class Reboot(Button):
+    name = "Reboot"
+    short_id = "reboot"
+
+    def callback(self):
+        pass
+
+
+@pytest.fixture
+def manager():
+    return MqttManager(node_id="node", unique_identifier="uid")
+
+
+@pytest.fixture
+def device(manager):
+    return {
+        "ids": manager.device_info["identifiers"],
+        "cns": manager.device_info["connections"],
+        "name": "node",
+        "sw": __version__,
+    }
+
+
+def common(device, short_id):
+    return {
+        "~": "node",
+        "avty_t": "node/availability",
+        "dev": device,
+        "uniq_id": "uid_%s" % short_id,
+        "json_attr_t": "~/%s/attrs" % short_id,
+    }
+
+
+@pytest.mark.parametrize("thing, component, expected", [
+    (Temperature(), "sensor", {
+        "name": "Temperature",
+        "stat_t": "~/temp/main",
+        "dev_cla": "temperature",
+        "stat_cla": "measurement",
+        "unit_of_meas": "°C",
+    }),
+    (Door(), "binary_sensor", {
+        "name": "Door",
+        "stat_t": "~/door/main",
+        "dev_cla": "door",
+    }),
+    (Plug(), "switch", {
+        "name": "Plug",
+        "cmd_t": "~/plug/set",
+        "stat_t": "~/plug/main",
+    }),
+    (Level(), "number", {
+        "name": "Level",
+        "cmd_t": "~/level/set",
+        "stat_t": "~/level/main",
+        "min": 0,
+        "max": 10,
+        "step": 1,
+    }),
+    (Fan(), "fan", {
+        "name": "Fan",
+        "cmd_t": "~/fan/set",
+        "stat_t": "~/fan/main",
+        "pct_cmd_t": "~/fan/speed/set",
+        "pct_stat_t": "~/fan/speed/state",
+        "spd_rng_min": 1,
+        "spd_rng_max": 100,
+    }),
+    (Lamp(), "light", {
+        "name": "Lamp",
+        "cmd_t": "~/lamp/set",
+        "schema": "json",
+        "opt": True,
+        "clrm": True,
+        "brightness": True,
+        "bri_scl": 255,
+        "sup_clrm": ["brightness"],
+    }),
+    (Reboot(), "button", {
+        "name": "Reboot",
+        "cmd_t": "~/reboot/press",
+    }),
+], ids=lambda value: value if isinstance(value, str) else None)
+def test_discovery_config(manager, device, thing, component, expected):
+    topic, config = manager.get_discovery_config(None, thing)
+
+    assert topic == "homeassistant/%s/node/%s/config" % (component, thing.short_id)
+    assert abbreviate(config) == {**common(device, thing.short_id), **expected}
+
+
+def test_device_discovery_config(manager, device):
+    manager.add_things([Temperature(), Plug()])
+    topic, config = manager.get_device_discovery_config(
+        None, [thing for _, thing in manager.things])
+
+    assert topic == "homeassistant/device/node/config"
+    assert abbreviate(config) == {
+        "~": "node",
+        "avty_t": "node/availability",
+        "dev": device,
+        "o": {
+            "name": "hass-mqtt-things",
+            "sw": __version__,
+            "url": "https://github.com/alexbarcelo/hass-mqtt-things",
+        },
+        "cmps": {
+            "temp": {
+                "p": "sensor",
+                "uniq_id": "uid_temp",
+                "name": "Temperature",
+                "json_attr_t": "~/temp/attrs",
+                "stat_t": "~/temp/main",
+                "dev_cla": "temperature",
+                "stat_cla": "measurement",
+                "unit_of_meas": "°C",
+            },
+            "plug": {
+                "p": "switch",
+                "uniq_id": "uid_plug",
+                "name": "Plug",
+                "json_attr_t": "~/plug/attrs",
+                "cmd_t": "~/plug/set",
+                "stat_t": "~/plug/main",
+            },
+        },
+    }
+
+
+def test_abbreviate_keeps_unknown_keys():
+    config = {"state_topic": "~/x/main", "not_a_discovery_key": 1}
+    assert abbreviate(config) == {"stat_t": "~/x/main", "not_a_discovery_key": 1}
+    assert not set(ABBREVIATIONS) & set(abbreviate(config))
+
+
+def test_discovery_cache_records_published_messages(tmp_path):
+    broker = FakeBroker()
+    cache = tmp_path / "discovery.json"
+    manager = MqttManager(client=FakeClient(broker), node_id="node", unique_identifier="uid",
+                          discovery_cache=str(cache))
+    manager.add_things([Temperature(), Plug()])
+
+    # Not connected: nothing is recorded, so the next discovery retries
+    manager.publish_discovery()
+    assert manager.discovery_cache.hashes == {}
+    assert not cache.exists()
+
+    manager.client.connect()
+    assert len(manager.discovery_cache.hashes) == 2
+    assert cache.exists()
+
+    manager.publish_discovery()
+    assert manager.discovery_stats["skipped"] == 2
@@ -0,0 +1,32 @@
+import pytest
+
+from ham.compact import CompactSensor
+from ham.fleet import build_fleet
+
+
+def test_publish_policy_fields():
+    [(_, things)] = build_fleet({"things": [{
+        "component": "sensor",
+        "short_id": "temp{index}",
+        "count": 2,
+        "device_class": "temperature",
+        "skip_unchanged": True,
+        "deadband": 0.5,
+        "max_silence": 600,
+        "rate_limit": 1.0,
+    }]})
+
+    first, second = things
+    assert isinstance(first, CompactSensor)
+    assert (first.short_id, second.short_id) == ("temp0", "temp1")
+    assert (first.skip_unchanged, first.deadband, first.max_silence) == (True, 0.5, 600)
+    assert first.rate_limit == 1.0
+    assert first.should_publish(20.0)
+    assert not first.should_publish(20.2)
+
+
+def test_unknown_fields():
+    # Switches have no publish policy
+    with pytest.raises(ValueError, match="Unknown fields for CompactSwitch: skip_unchanged"):
+        build_fleet({"things": [{"component": "switch", "short_id": "plug",
+                                 "skip_unchanged": True}]})
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from ham import MqttManager
+from ham.fake import FakeBroker, FakeClient
+from ham.fan import PercentageOptimisticFan
+from ham.sensor import Sensor
+
+
+class Stable(Sensor):
+    name = "Stable"
+    short_id = "stable"
+    skip_unchanged = True
+
+
+class DebouncedFan(PercentageOptimisticFan):
+    name = "Fan"
+    short_id = "fan"
+    debounce = 0.005
+
+    def __init__(self):
+        self.running = threading.Lock()
+        self.overlaps = 0
+
+    def _enter(self):
+        if not self.running.acquire(blocking=False):
+            self.overlaps += 1
+            self.running.acquire()
+        time.sleep(0.001)
+        self.running.release()
+
+    def callback(self, state: bool):
+        self._enter()
+        super().callback(state)
+
+    def speed_callback(self, speed: int):
+        self._enter()
+        super().speed_callback(speed)
+
+
+@pytest.fixture
+def manager():
+    broker = FakeBroker()
+    manager = MqttManager(client=FakeClient(broker), node_id="node", unique_identifier="uid")
+    manager.add_thing(Stable())
+    manager.client.connect()
+
+    manager.received = list()
+    listener = FakeClient(broker)
+    listener.on_message = lambda client, userdata, msg: manager.received.append(msg.payload)
+    listener.connect()
+    listener.subscribe("node/stable/main")
+    return manager
+
+
+def test_batch_keeps_latest(manager):
+    _, sensor = manager.things[0]
+    with manager.batch():
+        sensor.state = 1
+        with manager.batch():
+            sensor.state = 2
+        assert manager.received == []
+    assert manager.received == [b"2"]
+
+
+def test_batch_sends_on_exception(manager):
+    _, sensor = manager.things[0]
+    with pytest.raises(RuntimeError):
+        with manager.batch():
+            sensor.state = 5
+            raise RuntimeError
+
+    # The publish policy recorded 5 as published, so it must have been sent
+    sensor.state = 5
+    assert manager.received == [b"5"]
+
+
+def test_debounced_callback_in_sequence():
+    broker = FakeBroker()
+    manager = MqttManager(client=FakeClient(broker), node_id="node", unique_identifier="uid")
+    fan = DebouncedFan()
+    manager.add_thing(fan)
+    manager.client.connect()
+
+    home_assistant = FakeClient(broker)
+    home_assistant.connect()
+    for speed in range(1, 151):
+        if speed % 3:
+            home_assistant.publish("node/fan/set", "ON")
+        else:
+            home_assistant.publish("node/fan/speed/set", str(speed))
+    time.sleep(0.05)
+
+    # The trailing speed commands ran in a timer thread, but never along with
+    # the on/off ones, and they were counted only once
+    assert fan.overlaps == 0
+    assert manager.metrics.commands == 150
+    assert fan.speed == 150
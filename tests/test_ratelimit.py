@@ -0,0 +1,224 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ham import MqttManager, ratelimit
+from ham.fake import FakeBroker, FakeClient
+from ham.ratelimit import RateLimiter
+from ham.sensor import Sensor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+class Harness:
+    """A RateLimiter with its timers run by hand, recording the sent payloads."""
+
+    def __init__(self, clock, **kwargs):
+        self.clock = clock
+        self.sent = list()
+        self.timers = list()
+        self.limiter = RateLimiter(self._send, self._call_later, **kwargs)
+
+    def _send(self, messages):
+        self.sent.extend(payload for _, payload, _ in messages)
+
+    def _call_later(self, delay, callback):
+        self.timers.append((delay, callback))
+
+    def publish(self, thing, payload, topic=None):
+        topic = topic or "node/%s/main" % thing.short_id
+        if self.limiter.admit(topic, payload, False, thing):
+            self.sent.append(payload)
+
+    def advance(self, seconds):
+        """Move the clock forward and run the timers set until then."""
+        self.clock.now += seconds
+        timers, self.timers = self.timers, list()
+        for _, callback in timers:
+            callback()
+
+
+def _thing(short_id, rate=None, policy="delay", burst=None):
+    return SimpleNamespace(short_id=short_id, rate_limit=rate, rate_limit_burst=burst,
+                           rate_limit_policy=policy)
+
+
+@pytest.fixture(params=["global", "thing"])
+def limited(request, clock):
+    """Build a Harness with either a global bucket or a bucket for the Thing."""
+    def build(policy, rate=1.0, burst=1, max_pending=10000):
+        if request.param == "global":
+            harness = Harness(clock, rate=rate, burst=burst, policy=policy,
+                              max_pending=max_pending)
+            thing = _thing("limited")
+        else:
+            harness = Harness(clock, max_pending=max_pending)
+            thing = _thing("limited", rate, policy, burst)
+        harness.limiter.add_thing(thing)
+        return harness, thing
+    return build
+
+
+def test_drop(limited):
+    harness, thing = limited("drop", burst=2)
+    for payload in range(4):
+        harness.publish(thing, payload)
+    assert harness.sent == [0, 1]
+    assert harness.timers == []
+
+    harness.clock.now += 1
+    harness.publish(thing, 4)
+    assert harness.sent == [0, 1, 4]
+    assert harness.limiter.total.stats() == {
+        "passed": 3, "dropped": 2, "delayed": 0, "coalesced": 0,
+    }
+
+
+def test_delay(limited):
+    harness, thing = limited("delay", rate=4.0)
+    for payload in range(3):
+        harness.publish(thing, payload)
+    assert harness.sent == [0]
+    assert [delay for delay, _ in harness.timers] == [0.25]
+
+    harness.advance(0.25)
+    assert harness.sent == [0, 1]
+    harness.advance(0.25)
+    assert harness.sent == [0, 1, 2]
+    assert harness.timers == []
+    assert harness.limiter.stats()["delayed"] == 2
+
+
+def test_coalesce(limited):
+    harness, thing = limited("coalesce")
+    harness.publish(thing, 0)
+    harness.publish(thing, 1)
+    harness.publish(thing, 2, topic="node/limited/attrs")
+    harness.publish(thing, 3)
+    assert harness.sent == [0]
+
+    # Only the latest message of each topic is kept
+    harness.advance(1)
+    harness.advance(1)
+    assert harness.sent == [0, 2, 3]
+    assert harness.timers == []
+    assert harness.limiter.total.stats() == {
+        "passed": 1, "dropped": 0, "delayed": 3, "coalesced": 1,
+    }
+
+
+def test_max_pending(limited):
+    harness, thing = limited("delay", max_pending=3)
+    for payload in range(6):
+        harness.publish(thing, payload)
+    # The oldest queued messages are dropped
+    assert harness.limiter.stats()["pending"] == 3
+    assert harness.limiter.stats()["dropped"] == 2
+
+    for _ in range(3):
+        harness.advance(1)
+    assert harness.sent == [0, 3, 4, 5]
+
+
+def test_thing_order_behind_pending(clock):
+    harness = Harness(clock)
+    slow, free = _thing("slow", 1.0), _thing("free")
+    harness.limiter.add_thing(slow)
+    harness.limiter.add_thing(free)
+
+    harness.publish(slow, "slow 0")
+    harness.publish(slow, "slow 1")
+    clock.now += 1
+    # There is a token again, but the message waits for the queued one
+    harness.publish(slow, "slow 2")
+    # The other Things are not held by the queue of this one
+    harness.publish(free, "free 0")
+    assert harness.sent == ["slow 0", "free 0"]
+
+    harness.advance(0)
+    assert harness.sent == ["slow 0", "free 0", "slow 1"]
+    harness.advance(1)
+    assert harness.sent == ["slow 0", "free 0", "slow 1", "slow 2"]
+
+
+def test_global_order_behind_pending(clock):
+    harness = Harness(clock, rate=1.0, burst=1)
+    thing = _thing("thing")
+
+    harness.publish(thing, 0)
+    harness.publish(thing, 1)
+    clock.now += 1
+    harness.publish(thing, 2)
+    assert harness.sent == [0]
+
+    harness.advance(0)
+    harness.advance(1)
+    assert harness.sent == [0, 1, 2]
+
+
+def test_stats(clock):
+    harness = Harness(clock, rate=100.0, burst=100)
+    things = [_thing("dropping", 1.0, "drop"), _thing("coalescing", 1.0, "coalesce"),
+              _thing("delaying", 1.0, "delay"), _thing("unlimited")]
+    for thing in things:
+        harness.limiter.add_thing(thing)
+        for payload in range(3):
+            harness.publish(thing, payload)
+    unthrottled = _thing("unthrottled", 1.0)
+    harness.limiter.add_thing(unthrottled)
+    harness.publish(unthrottled, 0)
+
+    # Only the Things that were throttled are listed
+    assert harness.limiter.stats() == {
+        "passed": 1 + 1 + 1 + 3 + 1,
+        "dropped": 2,
+        "delayed": 2 + 2,
+        "coalesced": 1,
+        "pending": 1 + 2,
+        "things": {
+            "dropping": {"passed": 1, "dropped": 2, "delayed": 0, "coalesced": 0},
+            "coalescing": {"passed": 1, "dropped": 0, "delayed": 2, "coalesced": 1},
+            "delaying": {"passed": 1, "dropped": 0, "delayed": 2, "coalesced": 0},
+        },
+    }
+
+
+class Limited(Sensor):
+    name = "Limited"
+    short_id = "limited"
+    rate_limit = 1.0
+    rate_limit_policy = "drop"
+
+
+def test_manager_rate_limit():
+    broker = FakeBroker()
+    manager = MqttManager(client=FakeClient(broker), node_id="node", unique_identifier="uid")
+    sensor = Limited()
+    manager.add_thing(sensor)
+    manager.client.connect()
+
+    received = list()
+    listener = FakeClient(broker)
+    listener.on_message = lambda client, userdata, msg: received.append(msg.payload)
+    listener.connect()
+    listener.subscribe("node/limited/main")
+
+    for state in range(3):
+        sensor.state = state
+    assert received == [b"0"]
+    assert manager.get_metrics()["rate_limit"]["things"] == {
+        "limited": {"passed": 1, "dropped": 2, "delayed": 0, "coalesced": 0},
+    }
@@ -0,0 +1,104 @@
+from collections import Counter
+
+import pytest
+
+from ham import MqttManager
+from ham.async_manager import AsyncMqttManager
+from ham.scheduler import PollScheduler
+from ham.sensor import Sensor
+
+
+class Polled(Sensor):
+    name = "Polled"
+    short_id = "polled"
+    poll_interval = 1.0
+
+    def poll(self):
+        return 42
+
+
+class AsyncPolled(Polled):
+    short_id = "async_polled"
+
+    async def poll(self):
+        return 42
+
+
+class Counted:
+    """Minimal polled Thing, recording the tick of each poll."""
+    poll_interval = 1.0
+
+    def __init__(self, scheduler, polls):
+        self.scheduler = scheduler
+        self.polls = polls
+
+    def poll(self):
+        self.polls[self.scheduler.wheel.tick] += 1
+
+
+class NotPolled(Sensor):
+    name = "Not polled"
+    short_id = "not_polled"
+    poll_interval = 1.0
+
+
+def test_add_polled_thing():
+    manager = MqttManager(node_id="node", unique_identifier="uid")
+    manager.add_thing(Polled())
+    assert [entry.thing.short_id for entry in manager.scheduler.entries] == ["polled"]
+
+
+def test_reject_thing_without_poll():
+    manager = MqttManager(node_id="node", unique_identifier="uid")
+    with pytest.raises(TypeError):
+        manager.add_thing(NotPolled())
+
+
+def test_reject_coroutine_poll_without_event_loop():
+    manager = MqttManager(node_id="node", unique_identifier="uid")
+    with pytest.raises(TypeError):
+        manager.add_thing(AsyncPolled())
+
+    manager = AsyncMqttManager(node_id="node", unique_identifier="uid")
+    manager.add_thing(AsyncPolled())
+    assert len(manager.scheduler.entries) == 1
+
+
+def _polls_per_tick(scheduler, start, seconds):
+    """Tick every 0.1 s from `start`; return the polls of each tick."""
+    polls = Counter()
+    for thing in scheduler.entries:
+        thing.thing.polls = polls
+    for step in range(1, int(seconds * 10) + 1):
+        scheduler.tick(start + step * 0.1 + 0.01)
+    return polls
+
+
+def _scheduler(count=1000):
+    scheduler = PollScheduler()
+    for _ in range(count):
+        scheduler.add(Counted(scheduler, Counter()))
+    return scheduler
+
+
+def test_restart_spreads_polls():
+    scheduler = _scheduler()
+    # The scheduler starts running 3 s (3 intervals) after the Things were added
+    start = scheduler.wheel.start + 3
+    scheduler.restart(start)
+
+    polls = _polls_per_tick(scheduler, start, 2)
+    assert sum(polls.values()) == 2000
+    assert max(polls.values()) < 200
+
+
+def test_catch_up_keeps_phase():
+    scheduler = _scheduler()
+    start = scheduler.wheel.start
+    # Stall of 3 intervals: the overdue polls run at once, but only once
+    polls = _polls_per_tick(scheduler, start + 3, 0.1)
+    assert sum(polls.values()) == 1000
+
+    polls = _polls_per_tick(scheduler, start + 3.1, 2)
+    assert sum(polls.values()) == 2000
+    assert max(polls.values()) < 200
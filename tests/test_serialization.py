@@ -0,0 +1,21 @@
+import importlib.util
+
+import pytest
+
+from ham import serialization
+
+BACKENDS = [name for name in ("orjson", "ujson", "json") if importlib.util.find_spec(name)]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    previous = serialization.json_backend
+    serialization.set_json_backend(request.param)
+    yield request.param
+    serialization.set_json_backend(previous)
+
+
+def test_dumps_non_str_keys(backend):
+    payload = serialization.dumps({1: "one", "two": 2.5}, compact=True)
+    assert payload == b'{"1":"one","two":2.5}'
+    assert serialization.loads(payload) == {"1": "one", "two": 2.5}
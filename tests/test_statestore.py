@@ -0,0 +1,129 @@
+import pytest
+
+from ham import MqttManager, statestore
+from ham.fake import FakeBroker, FakeClient
+from ham.fan import PercentageOptimisticFan
+from ham.serialization import dumps
+from ham.statestore import LogStateStore
+from ham.switch import OptimisticSwitch
+
+
+class Plug(OptimisticSwitch):
+    name = "Plug"
+    short_id = "plug"
+
+
+class Fan(PercentageOptimisticFan):
+    name = "Fan"
+    short_id = "fan"
+
+
+def _record(short_id, field, value):
+    return dumps([short_id, field, value]) + b"\n"
+
+
+def _store(path, **kwargs):
+    # Flushed by hand, not by the background thread
+    return LogStateStore(path, flush_interval=3600, **kwargs)
+
+
+@pytest.mark.parametrize("last_line", [
+    b'["plug", "_sta',
+    b'\x00\x00\x00\x00',
+    b'["plug", "_state"]\n',
+], ids=["truncated", "garbage", "malformed"])
+def test_corrupted_last_line(tmp_path, last_line):
+    path = tmp_path / "states.log"
+    path.write_bytes(_record("plug", "_state", True) + _record("fan", "_speed", 40) + last_line)
+
+    store = _store(path)
+    assert store.load() == {"plug": {"_state": True}, "fan": {"_speed": 40}}
+    # The log was rewritten without the corrupted record, which would
+    # otherwise spoil the next one
+    store.put("plug", "_state", False)
+    store.close()
+
+    store = _store(path)
+    assert store.load() == {"plug": {"_state": False}, "fan": {"_speed": 40}}
+    store.close()
+
+
+@pytest.fixture
+def replaced(monkeypatch):
+    calls = list()
+    replace = statestore.os.replace
+
+    def recording_replace(src, dst):
+        calls.append((src, dst))
+        replace(src, dst)
+
+    monkeypatch.setattr(statestore.os, "replace", recording_replace)
+    return calls
+
+
+def test_compaction_threshold(tmp_path, replaced):
+    path = tmp_path / "states.log"
+    store = _store(path, compact_ratio=4)
+
+    for value in range(4):
+        store.put("plug", "_state", value % 2 == 0)
+        store.flush()
+    assert len(path.read_bytes().splitlines()) == 4
+    assert replaced == []
+
+    # A fifth record for a single value crosses the threshold
+    store.put("plug", "_state", True)
+    store.flush()
+    assert replaced == [("%s.tmp" % path, path)]
+    assert path.read_bytes() == _record("plug", "_state", True)
+
+    # The log is appended to after the compaction
+    store.put("fan", "_speed", 40)
+    store.close()
+    assert path.read_bytes() == _record("plug", "_state", True) + _record("fan", "_speed", 40)
+    assert not (tmp_path / "states.log.tmp").exists()
+
+
+def test_compaction_on_open(tmp_path, replaced):
+    path = tmp_path / "states.log"
+    path.write_bytes(b"".join(_record("plug", "_state", value % 2 == 0) for value in range(5)))
+
+    store = _store(path, compact_ratio=4)
+    assert replaced == [("%s.tmp" % path, path)]
+    assert path.read_bytes() == _record("plug", "_state", True)
+    store.close()
+
+
+def test_restore_and_publish_on_connect(tmp_path):
+    path = tmp_path / "states.log"
+    path.write_bytes(_record("plug", "_state", True) + _record("fan", "_state", True)
+                     + _record("fan", "_speed", 40))
+
+    broker = FakeBroker()
+    received = dict()
+    listener = FakeClient(broker)
+    listener.on_message = lambda client, userdata, msg: received.setdefault(msg.topic, msg.payload)
+    listener.connect()
+    listener.subscribe("node/+/main")
+    listener.subscribe("node/fan/speed/state")
+
+    manager = MqttManager(client=FakeClient(broker), node_id="node", unique_identifier="uid",
+                          state_store=str(path))
+    plug, fan = Plug(), Fan()
+    manager.add_things([plug, fan])
+    # Restored when added, published once connected
+    assert (plug.state, fan.state, fan.speed) == (True, True, 40)
+    assert received == {}
+
+    manager.client.connect()
+    assert received == {
+        "node/plug/main": b"ON",
+        "node/fan/main": b"ON",
+        "node/fan/speed/state": b"40",
+    }
+
+    listener.publish("node/plug/set", "OFF")
+    manager.state_store.close()
+    store = _store(path)
+    assert store.load()["plug"] == {"_state": False}
+    store.close()
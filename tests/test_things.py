@@ -0,0 +1,53 @@
+import pytest
+
+from ham import MqttManager
+from ham.fake import FakeBroker, FakeClient
+from ham.sensor import Sensor
+from ham.serialization import loads
+
+
+class Described(Sensor):
+    name = "Described"
+    short_id = "described"
+
+
+@pytest.fixture
+def published():
+    """Attributes received by a client subscribed to the Thing."""
+    broker = FakeBroker()
+    manager = MqttManager(client=FakeClient(broker), node_id="node", unique_identifier="uid")
+    thing = Described()
+    manager.add_thing(thing)
+    manager.client.connect()
+
+    messages = list()
+    listener = FakeClient(broker)
+    listener.on_message = lambda client, userdata, msg: messages.append(loads(msg.payload))
+    listener.connect()
+    listener.subscribe("node/described/attrs")
+    return manager, thing, messages
+
+
+def test_update_attributes(published):
+    manager, thing, messages = published
+    thing.attributes = {"a": 1}
+    thing.update_attributes(b=2)
+    thing.update_attributes(b=2)
+    assert messages == [{"a": 1}, {"a": 1, "b": 2}]
+
+
+def test_update_attributes_after_publish_many(published):
+    manager, thing, messages = published
+    thing.attributes = {"a": 1, "b": 2}
+    manager.publish_many(attributes=[(thing, {"a": 10, "b": 20})])
+    thing.update_attributes(c=3)
+    assert messages[-1] == {"a": 10, "b": 20, "c": 3}
+
+
+def test_skip_unchanged_after_publish_many(published):
+    manager, thing, messages = published
+    thing.skip_unchanged_attributes = True
+    thing.attributes = {"a": 1}
+    manager.publish_many(attributes=[(thing, {"a": 2})])
+    thing.attributes = {"a": 2}
+    assert messages == [{"a": 1}, {"a": 2}]